@@ -0,0 +1,62 @@
+"""Benchmark de latencia por petición de /analyze
+
+python benchmarks/bench_analyze.py [--peticiones 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# No mezclar las peticiones del benchmark con el almacén real
+os.environ["SHERLOCK_ALMACEN_LEADS"] = tempfile.mkdtemp(prefix="sherlock_bench_")
+os.environ.pop("SHERLOCK_INDICE_EMPRESAS", None)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+LEAD = dict(
+    nombre="Ricardo Empresario", empresa="TechCorp Solutions", facturacion_anual=800000, empleados=45,
+    industria="tecnología", pain_points=["generación de leads", "automatización de procesos"],
+    presupuesto_marketing=40000, canales_actuales=["Google Ads", "LinkedIn"],
+    objetivos_principales=["aumentar leads", "mejorar conversión"], urgencia=8, decision_maker=True
+)
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peticiones", type=int, default=2000)
+    args = parser.parse_args()
+    
+    # Sólo la lógica: scoring, diagnóstico y recomendaciones
+    lead = main.LeadData(**LEAD)
+    inicio = time.perf_counter()
+    for _ in range(args.peticiones * 10):
+        scoring = main.calcular_scoring(lead)
+        diagnostico = main.generar_diagnostico(lead, scoring)
+        main.generar_recomendaciones(lead, scoring, diagnostico)
+    logica = (time.perf_counter() - inicio) / (args.peticiones * 10)
+    
+    # Petición HTTP completa, con empresas distintas para no medir sólo duplicados
+    cliente = TestClient(main.app)
+    tiempos = []
+    for i in range(args.peticiones):
+        datos = dict(LEAD, empresa=f"Empresa {i}")
+        inicio = time.perf_counter()
+        respuesta = cliente.post("/analyze", json=datos)
+        tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == 200
+    
+    print(f"lógica de análisis:  {logica * 1e6:.1f} µs/lead")
+    print(f"/analyze p50 / p99:  {percentil(tiempos, 50) * 1e6:.0f} / {percentil(tiempos, 99) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main_bench()
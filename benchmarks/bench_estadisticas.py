@@ -0,0 +1,139 @@
+"""Benchmark de consultas de /stats sobre el almacén columnar de leads
+
+python benchmarks/bench_estadisticas.py [--leads 1000000] [--repeticiones 5] [--directorio DIR]
+
+Genera directamente los archivos de columna de un almacén sintético (leads
+repartidos en el último año entre 12 industrias) y mide consultas agrupadas y
+filtradas con AlmacenLeads.estadisticas, que es lo que ejecuta GET /stats.
+Con --leads 10000000 el almacén ocupa unos 660 MB en disco.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import CLASIFICACIONES, COLUMNAS_CATEGORICAS, COLUMNAS_NUMERICAS, AlmacenLeads  # noqa: E402
+
+INDUSTRIAS = ["tecnología", "software", "ecommerce", "fintech", "saas", "manufactura", "construcción",
+              "agricultura", "retail físico", "salud", "educación", "servicios"]
+FIN = datetime(2026, 10, 19)
+BLOQUE = 1000000
+
+
+def generar_bloque(rng, n):
+    """Columnas sintéticas de n leads con los rangos que produce calcular_scoring"""
+    score_financiero = rng.choice([5, 15, 20, 30], n).astype(np.uint8)
+    score_tamano = rng.choice([5, 10, 15, 20], n).astype(np.uint8)
+    score_presupuesto = rng.choice([5, 15, 20, 25], n).astype(np.uint8)
+    urgencia = rng.integers(1, 11, n)
+    score_urgencia = (urgencia / 10 * 15).astype(np.float32)
+    decision_maker = rng.random(n) < 0.5
+    score_autoridad = np.where(decision_maker, 10, 3).astype(np.uint8)
+    score_total = (score_financiero.astype(np.float32) + score_tamano + score_presupuesto
+                   + score_urgencia + score_autoridad)
+    clasificacion = np.select([score_total >= 80, score_total >= 60, score_total >= 40], [0, 1, 2], default=3)
+    facturacion = rng.lognormal(13, 1.2, n)
+    segundos_fin = int((FIN - datetime(1970, 1, 1)).total_seconds())
+    return {
+        "timestamp": rng.integers(segundos_fin - 365 * 86400, segundos_fin, n),
+        "score_total": score_total,
+        "score_financiero": score_financiero,
+        "score_tamano": score_tamano,
+        "score_presupuesto": score_presupuesto,
+        "score_urgencia": score_urgencia,
+        "score_autoridad": score_autoridad,
+        "potencial_ingresos": facturacion * rng.uniform(0.05, 0.3, n),
+        "facturacion_anual": facturacion,
+        "empleados": rng.integers(1, 1000, n),
+        "presupuesto_marketing": facturacion * rng.uniform(0, 0.15, n),
+        "urgencia": urgencia,
+        "decision_maker": decision_maker,
+        "clasificacion": clasificacion,
+        "industria": rng.integers(0, len(INDUSTRIAS), n),
+    }
+
+
+def generar_almacen(directorio, leads, semilla):
+    formatos = {**COLUMNAS_NUMERICAS, **COLUMNAS_CATEGORICAS}
+    manifiesto = {
+        "version": AlmacenLeads.VERSION,
+        "columnas": formatos,
+        "diccionarios": {"clasificacion": list(CLASIFICACIONES), "industria": INDUSTRIAS},
+    }
+    with open(os.path.join(directorio, "diccionarios.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False)
+    
+    rng = np.random.default_rng(semilla)
+    archivos = {columna: open(os.path.join(directorio, f"{columna}.bin"), "wb") for columna in formatos}
+    try:
+        for inicio in range(0, leads, BLOQUE):
+            bloque = generar_bloque(rng, min(BLOQUE, leads - inicio))
+            for columna, formato in formatos.items():
+                bloque[columna].astype(np.dtype(formato)).tofile(archivos[columna])
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+
+
+CONSULTAS = [
+    ("sin agrupar", {}),
+    ("clasificacion", {"agrupar_por": ["clasificacion"]}),
+    ("industria,clasificacion", {"agrupar_por": ["industria", "clasificacion"]}),
+    ("dia", {"agrupar_por": ["dia"]}),
+    ("semana,industria", {"agrupar_por": ["semana", "industria"]}),
+    ("últimos 30 días", {"desde": FIN - timedelta(days=30)}),
+    ("clasificacion=HOT por dia", {"clasificacion": "HOT", "agrupar_por": ["dia"]}),
+    ("salud, 90 días, por semana", {"industria": "salud", "desde": FIN - timedelta(days=90),
+                                    "agrupar_por": ["semana"]}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leads", type=int, default=1000000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--directorio", help="Conserva el almacén generado en este directorio")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+    
+    directorio = args.directorio or tempfile.mkdtemp(prefix="sherlock_bench_stats_")
+    os.makedirs(directorio, exist_ok=True)
+    try:
+        inicio = time.perf_counter()
+        generar_almacen(directorio, args.leads, args.semilla)
+        generacion = time.perf_counter() - inicio
+        tamano = sum(os.path.getsize(os.path.join(directorio, f)) for f in os.listdir(directorio))
+        
+        inicio = time.perf_counter()
+        almacen = AlmacenLeads(directorio, solo_lectura=True)
+        apertura = time.perf_counter() - inicio
+        assert almacen.filas == args.leads
+        
+        print(f"leads:     {args.leads} ({tamano / 1e6:.0f} MB, generados en {generacion:.1f} s, "
+              f"apertura {apertura * 1000:.1f} ms)")
+        print(f"{'consulta':<30} {'grupos':>7} {'primera':>10} {'mediana':>10} {'máx':>10}")
+        for nombre, parametros in CONSULTAS:
+            tiempos = []
+            for _ in range(args.repeticiones + 1):
+                inicio = time.perf_counter()
+                resultado = almacen.estadisticas(**parametros)
+                tiempos.append(time.perf_counter() - inicio)
+            resto = tiempos[1:]
+            print(f"{nombre:<30} {len(resultado['grupos']):>7} {tiempos[0] * 1000:>8.1f}ms "
+                  f"{statistics.median(resto) * 1000:>8.1f}ms {max(resto) * 1000:>8.1f}ms")
+    finally:
+        if not args.directorio:
+            shutil.rmtree(directorio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark del índice de empresas duplicadas
+
+python benchmarks/bench_indice_empresas.py [--empresas 1000000] [--consultas 2000] [--concurrentes 200000]
+
+Mide la latencia de inserción (incluidas las que sellan una corrida), las
+búsquedas con el índice en reposo y las búsquedas mientras otro hilo sigue
+insertando empresas y fusionando corridas, que es el caso del servicio. En
+ese caso el p99 queda dominado por el intervalo de cambio del GIL (5 ms),
+no por el lock del índice: el hilo que inserta ejecuta código Python.
+"""
+import argparse
+import gc
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import IndiceEmpresas  # noqa: E402
+
+
+def nombre_aleatorio(rnd):
+    return " ".join(
+        "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9)))
+        for _ in range(rnd.randint(1, 3))
+    )
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def latencias(tiempos):
+    return " / ".join(f"{percentil(tiempos, p) * 1e6:.0f}" for p in (50, 99, 99.9)) + \
+        f" / {max(tiempos) * 1e6:.0f} µs"
+
+
+def esperar_compactacion(indice):
+    with indice._lock_fusion:
+        pass
+    indice._compactar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--empresas", type=int, default=1000000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--concurrentes", type=int, default=200000,
+                        help="Empresas insertadas por otro hilo durante las búsquedas concurrentes")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+    
+    rnd = random.Random(args.semilla)
+    nombres = [nombre_aleatorio(rnd) for _ in range(args.empresas)]
+    indice = IndiceEmpresas()
+    tiempos_insercion = []
+    inicio = time.perf_counter()
+    for i, nombre in enumerate(nombres):
+        t = time.perf_counter()
+        indice.agregar(f"LEAD_{i:08d}", nombre)
+        tiempos_insercion.append(time.perf_counter() - t)
+    construccion = time.perf_counter() - inicio
+    esperar_compactacion(indice)
+    
+    variantes = [(i, rnd.choice([nombres[i].upper() + " S.A.", nombres[i].title() + " Solutions",
+                                 nombres[i] + " inc"]))
+                 for i in rnd.sample(range(args.empresas), min(args.consultas, args.empresas))]
+    tiempos = []
+    aciertos = 0
+    for i, variante in variantes:
+        inicio = time.perf_counter()
+        duplicado = indice.buscar(variante)
+        tiempos.append(time.perf_counter() - inicio)
+        aciertos += bool(duplicado and duplicado["lead_id"] == f"LEAD_{i:08d}")
+    
+    conocidos = set(nombres)
+    distintos = [n for n in (nombre_aleatorio(rnd) for _ in range(args.consultas)) if n not in conocidos]
+    falsos_positivos = sum(1 for nombre in distintos if indice.buscar(nombre))
+    
+    # Búsquedas mientras otro hilo inserta: sellados cada LIMITE_PENDIENTES y fusiones de corridas
+    nuevos = [nombre_aleatorio(rnd) for _ in range(args.concurrentes)]
+    # Los millones de objetos del propio benchmark no deben provocar pausas del recolector
+    gc.freeze()
+    terminado = threading.Event()
+    def insertar():
+        for i, nombre in enumerate(nuevos):
+            indice.agregar(f"NUEVO_{i:08d}", nombre)
+        terminado.set()
+    escritor = threading.Thread(target=insertar)
+    tiempos_concurrentes = []
+    inicio = time.perf_counter()
+    escritor.start()
+    while not terminado.is_set():
+        _, variante = variantes[len(tiempos_concurrentes) % len(variantes)]
+        t = time.perf_counter()
+        indice.buscar(variante)
+        tiempos_concurrentes.append(time.perf_counter() - t)
+    escritor.join()
+    concurrente = time.perf_counter() - inicio
+    esperar_compactacion(indice)
+    
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "indice.npz")
+        inicio = time.perf_counter()
+        indice.guardar(ruta)
+        guardado = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        IndiceEmpresas.cargar(ruta)
+        carga = time.perf_counter() - inicio
+        tamano = os.path.getsize(ruta)
+    
+    print(f"empresas:                    {args.empresas}")
+    print(f"construcción:                {construccion:.1f} s ({construccion / args.empresas * 1e6:.1f} µs/empresa)")
+    print(f"inserción p50/p99/p99.9/max: {latencias(tiempos_insercion)}")
+    print(f"búsqueda p50/p99/p99.9/max:  {latencias(tiempos)}")
+    print(f"con {args.concurrentes} inserciones en paralelo ({concurrente:.1f} s, "
+          f"{len(tiempos_concurrentes)} búsquedas):")
+    print(f"  búsqueda p50/p99/p99.9/max: {latencias(tiempos_concurrentes)}")
+    print(f"corridas:                    {[len(claves) // indice.bandas for claves, _ in indice._corridas]}")
+    print(f"recall variantes:            {aciertos / len(variantes):.4f}")
+    print(f"falsos positivos:            {falsos_positivos / len(distintos):.4f}")
+    print(f"guardar / cargar:            {guardado * 1000:.0f} / {carga * 1000:.0f} ms ({tamano / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from pydantic import BaseModel
 from typing import Dict, List, Optional
+from types import MappingProxyType
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from itertools import permutations, product
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import json
-from datetime import datetime
+import logging
+import multiprocessing
+import os
+import random
+import re
+import struct
+import sys
+import tempfile
+import threading
+import unicodedata
+import uuid
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
 
-app = FastAPI(title="Sherlock MVP", description="Sistema de análisis de leads", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Persistir el índice de empresas y cerrar el almacén al detener el servicio
+    if _indice_empresas is not None:
+        _indice_empresas.cerrar()
+    if _almacen_leads is not None:
+        _almacen_leads.cerrar()
+    cerrar_pool_simulacion()
+
+app = FastAPI(title="Sherlock MVP", description="Sistema de análisis de leads", version="1.0.0",
+              lifespan=lifespan)
 
 # Modelos de datos
 class LeadData(BaseModel):
@@ -26,6 +59,7 @@ class SherlockResponse(BaseModel):
     scoring: Dict
     diagnostico: Dict
     recomendaciones: Dict
+    duplicado: Optional[Dict] = None  # lead existente de la misma empresa, si lo hay
 
 # Lógica de scoring
 def calcular_scoring(lead: LeadData) -> Dict:
@@ -97,62 +131,183 @@ def calcular_scoring(lead: LeadData) -> Dict:
         "porcentaje": round((score_total / 100) * 100, 1)
     }
 
+# Tablas precalculadas de diagnóstico y recomendaciones
+#
+# Todo el texto de generar_diagnostico y generar_recomendaciones depende de un
+# estado discreto pequeño (umbrales de score, clasificación, decisor, urgencia,
+# categorías de pain points). Se construye una vez al importar el módulo y por
+# cada lead sólo se rellenan los campos numéricos.
+CLASIFICACIONES = ("HOT", "WARM", "COLD", "UNQUALIFIED")
+
+INDUSTRIAS_DIGITALES = ("tecnología", "software", "ecommerce", "fintech", "saas")
+INDUSTRIAS_TRADICIONALES = ("manufactura", "construcción", "agricultura", "retail físico")
+
+# (palabras clave, categoría, severidad) en orden de evaluación
+REGLAS_PAIN_POINTS = (
+    (("lead", "cliente"), "generación_leads", "Crítico"),
+    (("conversión", "venta"), "conversión", "Crítico"),
+    (("automatización", "proceso"), "automatización", "Importante"),
+    (("seguimiento", "nurturing"), "nurturing", "Importante"),
+)
+SEVERIDAD_PAIN = {categoria: severidad for _, categoria, severidad in REGLAS_PAIN_POINTS}
+
+def _construir_tabla_diagnostico() -> Dict:
+    """Fortalezas y debilidades para cada combinación de umbrales"""
+    tabla = {}
+    for clave in product((False, True), repeat=8):
+        (fin_alto, fin_bajo, tam_alto, pres_alto, pres_bajo,
+         urg_alta, urg_baja, decisor) = clave
+        fortalezas = []
+        if fin_alto:
+            fortalezas.append("Empresa con sólida capacidad financiera")
+        if tam_alto:
+            fortalezas.append("Organización de tamaño considerable")
+        if pres_alto:
+            fortalezas.append("Presupuesto de marketing bien dimensionado")
+        if urg_alta:
+            fortalezas.append("Alta urgencia en la necesidad")
+        if decisor:
+            fortalezas.append("Contacto directo con tomador de decisiones")
+        debilidades = []
+        if fin_bajo:
+            debilidades.append("Capacidad financiera limitada")
+        if pres_bajo:
+            debilidades.append("Presupuesto de marketing insuficiente")
+        if urg_baja:
+            debilidades.append("Baja urgencia en la implementación")
+        if not decisor:
+            debilidades.append("No es el decisor final")
+        tabla[clave] = (tuple(fortalezas), tuple(debilidades))
+    return MappingProxyType(tabla)
+
+def _construir_tabla_pain_points() -> Dict:
+    """Análisis de pain points para cada secuencia ordenada de categorías"""
+    categorias = tuple(SEVERIDAD_PAIN)
+    tabla = {}
+    for n in range(len(categorias) + 1):
+        for secuencia in permutations(categorias, n):
+            tabla[secuencia] = tuple((c, SEVERIDAD_PAIN[c]) for c in secuencia)
+    return MappingProxyType(tabla)
+
+def _construir_tabla_recomendaciones() -> Dict:
+    """Partes fijas de las recomendaciones para cada combinación de estado
+
+    La clave es (clasificación, pain de generación de leads, presupuesto alto,
+    urgencia >= 7); el presupuesto sugerido se completa por lead.
+    """
+    tabla = {}
+    for clasificacion, generacion_leads, presupuesto_alto, urgente in product(
+            CLASIFICACIONES, (False, True), (False, True), (False, True)):
+        hot = clasificacion == "HOT"
+        warm = clasificacion == "WARM"
+        
+        dali_tasks = []
+        if generacion_leads:
+            dali_tasks.append("Crear case study específico para su industria")
+            dali_tasks.append("Diseñar landing page personalizada")
+        if hot or warm:
+            dali_tasks.append("Preparar propuesta visual personalizada")
+            dali_tasks.append("Crear demo interactivo del producto")
+        
+        zuckerberg_tasks = []
+        if presupuesto_alto:
+            zuckerberg_tasks.append("Proponer estrategia de LinkedIn Ads B2B")
+            zuckerberg_tasks.append("Configurar campañas de retargeting")
+        if urgente:
+            zuckerberg_tasks.append("Implementar campaña de urgencia limitada")
+        
+        if hot:
+            coach_tasks = ("Agendar demo en próximas 48h",
+                           "Preparar propuesta comercial personalizada")
+            proximos_pasos = (
+                "🔥 URGENTE: Coach agenda demo en 24-48h",
+                "🎨 Dali prepara propuesta visual personalizada",
+                "📱 Zuckerberg configura retargeting inmediato"
+            )
+        elif warm:
+            coach_tasks = ("Secuencia de nurturing de 5 emails",
+                           "Llamada de descubrimiento en 1 semana")
+            proximos_pasos = (
+                "📞 Coach programa llamada de descubrimiento",
+                "🎯 Zuckerberg inicia campaña de nurturing",
+                "📄 Dali crea contenido educativo específico"
+            )
+        else:
+            coach_tasks = ("Incluir en secuencia de educación mensual",
+                           "Seguimiento trimestral de re-calificación")
+            proximos_pasos = (
+                "📧 Coach incluye en secuencia automatizada",
+                "📊 Seguimiento mensual de comportamiento",
+                "🔄 Re-evaluación en 90 días"
+            )
+        
+        tabla[(clasificacion, generacion_leads, presupuesto_alto, urgente)] = (
+            "ALTA" if hot or warm else "MEDIA",         # dali prioridad
+            tuple(dali_tasks),
+            "48h" if hot else "1 semana",               # dali deadline
+            "ALTA" if presupuesto_alto else "MEDIA",    # zuckerberg prioridad
+            tuple(zuckerberg_tasks),
+            "CRÍTICA" if hot else "ALTA",               # coach prioridad
+            coach_tasks,
+            "Inmediato" if hot else "1-2 semanas",      # coach seguimiento
+            proximos_pasos,
+        )
+    return MappingProxyType(tabla)
+
+TABLA_DIAGNOSTICO = _construir_tabla_diagnostico()
+TABLA_PAIN_POINTS = _construir_tabla_pain_points()
+TABLA_RECOMENDACIONES = _construir_tabla_recomendaciones()
+
+@lru_cache(maxsize=1024)
+def clasificar_industria(industria: str) -> str:
+    """Perfil digital según la industria declarada"""
+    industria = industria.lower()
+    if any(ind in industria for ind in INDUSTRIAS_DIGITALES):
+        return "ALTO - Industria naturalmente digital"
+    if any(ind in industria for ind in INDUSTRIAS_TRADICIONALES):
+        return "MEDIO - Industria en proceso de digitalización"
+    return "VARIABLE - Requiere análisis específico"
+
+@lru_cache(maxsize=4096)
+def categorizar_pain_point(pain: str) -> Optional[str]:
+    """Categoría de un pain point, o None si no coincide con ninguna regla"""
+    pain = pain.lower()
+    for palabras, categoria, _ in REGLAS_PAIN_POINTS:
+        if any(palabra in pain for palabra in palabras):
+            return categoria
+    return None
+
+def categorizar_pain_points(pain_points: List[str]) -> tuple:
+    """Categorías de pain points en orden de primera aparición"""
+    categorias = []
+    for pain in pain_points:
+        categoria = categorizar_pain_point(pain)
+        if categoria is not None and categoria not in categorias:
+            categorias.append(categoria)
+    return tuple(categorias)
+
 def generar_diagnostico(lead: LeadData, scoring: Dict) -> Dict:
     """Genera diagnóstico detallado del lead"""
     
-    # Análisis de fortalezas
-    fortalezas = []
-    if scoring["score_financiero"] >= 20:
-        fortalezas.append("Empresa con sólida capacidad financiera")
-    if scoring["score_tamano"] >= 15:
-        fortalezas.append("Organización de tamaño considerable")
-    if scoring["score_presupuesto"] >= 20:
-        fortalezas.append("Presupuesto de marketing bien dimensionado")
-    if scoring["score_urgencia"] >= 10:
-        fortalezas.append("Alta urgencia en la necesidad")
-    if lead.decision_maker:
-        fortalezas.append("Contacto directo con tomador de decisiones")
-    
-    # Análisis de debilidades
-    debilidades = []
-    if scoring["score_financiero"] < 15:
-        debilidades.append("Capacidad financiera limitada")
-    if scoring["score_presupuesto"] < 15:
-        debilidades.append("Presupuesto de marketing insuficiente")
-    if scoring["score_urgencia"] < 8:
-        debilidades.append("Baja urgencia en la implementación")
-    if not lead.decision_maker:
-        debilidades.append("No es el decisor final")
-    
-    # Análisis de industria
-    industrias_digitales = ["tecnología", "software", "ecommerce", "fintech", "saas"]
-    industrias_tradicionales = ["manufactura", "construcción", "agricultura", "retail físico"]
-    
-    if any(ind in lead.industria.lower() for ind in industrias_digitales):
-        perfil_digital = "ALTO - Industria naturalmente digital"
-    elif any(ind in lead.industria.lower() for ind in industrias_tradicionales):
-        perfil_digital = "MEDIO - Industria en proceso de digitalización"
-    else:
-        perfil_digital = "VARIABLE - Requiere análisis específico"
-    
-    # Pain points principales
-    pain_analysis = {}
-    for pain in lead.pain_points:
-        if "lead" in pain.lower() or "cliente" in pain.lower():
-            pain_analysis["generación_leads"] = "Crítico"
-        elif "conversión" in pain.lower() or "venta" in pain.lower():
-            pain_analysis["conversión"] = "Crítico"
-        elif "automatización" in pain.lower() or "proceso" in pain.lower():
-            pain_analysis["automatización"] = "Importante"
-        elif "seguimiento" in pain.lower() or "nurturing" in pain.lower():
-            pain_analysis["nurturing"] = "Importante"
+    clave = (
+        scoring["score_financiero"] >= 20,
+        scoring["score_financiero"] < 15,
+        scoring["score_tamano"] >= 15,
+        scoring["score_presupuesto"] >= 20,
+        scoring["score_presupuesto"] < 15,
+        scoring["score_urgencia"] >= 10,
+        scoring["score_urgencia"] < 8,
+        bool(lead.decision_maker),
+    )
+    fortalezas, debilidades = TABLA_DIAGNOSTICO[clave]
+    pain_analysis = TABLA_PAIN_POINTS[categorizar_pain_points(lead.pain_points)]
     
     return {
         "resumen": f"Lead {scoring['clasificacion']} con {scoring['porcentaje']}% de fit",
-        "fortalezas": fortalezas,
-        "debilidades": debilidades,
-        "perfil_digital": perfil_digital,
-        "pain_points_criticos": pain_analysis,
+        "fortalezas": list(fortalezas),
+        "debilidades": list(debilidades),
+        "perfil_digital": clasificar_industria(lead.industria),
+        "pain_points_criticos": dict(pain_analysis),
         "potencial_ingresos": lead.presupuesto_marketing * 0.3,  # Estimación conservadora
         "tiempo_estimado_cierre": "2-4 semanas" if scoring["clasificacion"] == "HOT" else "1-3 meses"
     }
@@ -160,77 +315,1108 @@ def generar_diagnostico(lead: LeadData, scoring: Dict) -> Dict:
 def generar_recomendaciones(lead: LeadData, scoring: Dict, diagnostico: Dict) -> Dict:
     """Genera recomendaciones específicas para cada agente"""
     
-    # Recomendaciones para Dali (Creatividad/Contenido)
-    dali_tasks = []
-    if "generación_leads" in diagnostico["pain_points_criticos"]:
-        dali_tasks.append("Crear case study específico para su industria")
-        dali_tasks.append("Diseñar landing page personalizada")
-    if scoring["clasificacion"] in ["HOT", "WARM"]:
-        dali_tasks.append("Preparar propuesta visual personalizada")
-        dali_tasks.append("Crear demo interactivo del producto")
-    
-    # Recomendaciones para Zuckerberg (Paid Media)
-    zuckerberg_tasks = []
-    if scoring["score_presupuesto"] >= 20:
-        zuckerberg_tasks.append("Proponer estrategia de LinkedIn Ads B2B")
-        zuckerberg_tasks.append("Configurar campañas de retargeting")
-    if lead.urgencia >= 7:
-        zuckerberg_tasks.append("Implementar campaña de urgencia limitada")
-    
-    zuckerberg_tasks.append(f"Presupuesto sugerido: ${int(lead.presupuesto_marketing * 0.4)}/mes")
-    
-    # Recomendaciones para Coach (Seguimiento/Conversión)
-    coach_tasks = []
-    if scoring["clasificacion"] == "HOT":
-        coach_tasks.append("Agendar demo en próximas 48h")
-        coach_tasks.append("Preparar propuesta comercial personalizada")
-    elif scoring["clasificacion"] == "WARM":
-        coach_tasks.append("Secuencia de nurturing de 5 emails")
-        coach_tasks.append("Llamada de descubrimiento en 1 semana")
-    else:
-        coach_tasks.append("Incluir en secuencia de educación mensual")
-        coach_tasks.append("Seguimiento trimestral de re-calificación")
+    clasificacion = scoring["clasificacion"]
+    if clasificacion not in CLASIFICACIONES:
+        clasificacion = "UNQUALIFIED"
+    (dali_prioridad, dali_tasks, dali_deadline,
+     zuckerberg_prioridad, zuckerberg_tasks,
+     coach_prioridad, coach_tasks, coach_seguimiento,
+     proximos_pasos) = TABLA_RECOMENDACIONES[(
+        clasificacion,
+        "generación_leads" in diagnostico["pain_points_criticos"],
+        scoring["score_presupuesto"] >= 20,
+        lead.urgencia >= 7,
+    )]
     
-    # Próximos pasos priorizados
-    if scoring["clasificacion"] == "HOT":
-        proximos_pasos = [
-            "🔥 URGENTE: Coach agenda demo en 24-48h",
-            "🎨 Dali prepara propuesta visual personalizada",
-            "📱 Zuckerberg configura retargeting inmediato"
-        ]
-    elif scoring["clasificacion"] == "WARM":
-        proximos_pasos = [
-            "📞 Coach programa llamada de descubrimiento",
-            "🎯 Zuckerberg inicia campaña de nurturing",
-            "📄 Dali crea contenido educativo específico"
-        ]
-    else:
-        proximos_pasos = [
-            "📧 Coach incluye en secuencia automatizada",
-            "📊 Seguimiento mensual de comportamiento",
-            "🔄 Re-evaluación en 90 días"
-        ]
+    presupuesto_sugerido = int(lead.presupuesto_marketing * 0.4)
     
     return {
         "dali": {
-            "prioridad": "ALTA" if scoring["clasificacion"] in ["HOT", "WARM"] else "MEDIA",
-            "tareas": dali_tasks,
-            "deadline": "48h" if scoring["clasificacion"] == "HOT" else "1 semana"
+            "prioridad": dali_prioridad,
+            "tareas": list(dali_tasks),
+            "deadline": dali_deadline
         },
         "zuckerberg": {
-            "prioridad": "ALTA" if scoring["score_presupuesto"] >= 20 else "MEDIA",
-            "tareas": zuckerberg_tasks,
-            "presupuesto_sugerido": int(lead.presupuesto_marketing * 0.4)
+            "prioridad": zuckerberg_prioridad,
+            "tareas": [*zuckerberg_tasks, f"Presupuesto sugerido: ${presupuesto_sugerido}/mes"],
+            "presupuesto_sugerido": presupuesto_sugerido
         },
         "coach": {
-            "prioridad": "CRÍTICA" if scoring["clasificacion"] == "HOT" else "ALTA",
-            "tareas": coach_tasks,
-            "seguimiento": "Inmediato" if scoring["clasificacion"] == "HOT" else "1-2 semanas"
+            "prioridad": coach_prioridad,
+            "tareas": list(coach_tasks),
+            "seguimiento": coach_seguimiento
         },
-        "proximos_pasos": proximos_pasos,
+        "proximos_pasos": list(proximos_pasos),
         "timeline_estimado": diagnostico["tiempo_estimado_cierre"]
     }
 
+def serializar_respuesta(lead_id: str, timestamp: str, scoring: Dict,
+                         diagnostico: Dict, recomendaciones: Dict,
+                         duplicado: Optional[Dict] = None) -> bytes:
+    """Serializa un SherlockResponse a JSON sin pasar por la validación del modelo"""
+    return json.dumps({
+        "lead_id": lead_id,
+        "timestamp": timestamp,
+        "scoring": scoring,
+        "diagnostico": diagnostico,
+        "recomendaciones": recomendaciones,
+        "duplicado": duplicado
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Detección de leads duplicados por nombre de empresa
+#
+# Índice en memoria: nombres normalizados, firmas MinHash sobre trigramas de
+# caracteres y LSH por bandas para obtener candidatos, que luego se puntúan con
+# la similitud de Jaccard exacta.
+SUFIJOS_EMPRESA = {
+    # formas jurídicas
+    "sa", "sas", "sl", "srl", "sac", "saa", "spa", "cv", "de", "rl", "ltda",
+    "inc", "llc", "ltd", "corp", "corporation", "co", "gmbh", "ag", "plc", "bv",
+    # descriptores genéricos
+    "solutions", "soluciones", "group", "grupo", "holding", "company", "compania",
+    "international", "internacional", "global", "services", "servicios",
+}
+
+@lru_cache(maxsize=4096)
+def normalizar_empresa(empresa: str) -> str:
+    """Nombre de empresa sin acentos, puntuación, formas jurídicas ni descriptores genéricos
+
+    Puede devolver "" si el nombre no tiene letras ni dígitos (p. ej. "!!!").
+    """
+    texto = empresa.lower()
+    if not texto.isascii():
+        # Sólo se quitan los acentos de letras latinas; otros alfabetos se conservan
+        caracteres = []
+        for c in unicodedata.normalize("NFKD", texto):
+            if unicodedata.combining(c) and caracteres and caracteres[-1].isascii():
+                continue
+            caracteres.append(c)
+        texto = unicodedata.normalize("NFC", "".join(caracteres))
+    # "S.A." -> "sa", "S.A. de C.V." -> "sa de cv"
+    texto = texto.replace(".", "")
+    tokens = re.findall(r"[^\W_]+", texto)
+    significativos = [t for t in tokens if t not in SUFIJOS_EMPRESA]
+    return " ".join(significativos or tokens)
+
+def trigramas(nombre: str) -> frozenset:
+    """Trigramas de caracteres del nombre normalizado, con relleno en los extremos
+
+    Se ignoran los espacios para que "Data Soft" y "DataSoft" coincidan.
+    """
+    texto = f"  {nombre.replace(' ', '')} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+def similitud_jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class IndiceEmpresas:
+    """Índice MinHash-LSH de empresas ya analizadas
+
+    No hay un objeto de Python por empresa; todo vive en arrays empaquetados:
+    los textos "lead_id\\0empresa" concatenados en UTF-8 con sus desplazamientos
+    y las claves LSH en corridas ordenadas e inmutables (claves int64 con la
+    banda en los bits bajos y la posición de la empresa en uint32). Las últimas
+    inserciones esperan en un bloque de claves pendientes; al llenarse se ordena
+    como una corrida nueva y las corridas vecinas de tamaño parecido se fusionan
+    (cada una al menos el doble que la siguiente), así que hay O(log n) corridas
+    y cada clave se copia O(log n) veces. Las fusiones se hacen en un hilo aparte
+    fuera del lock de consultas; sólo el intercambio de la lista de corridas lo toma.
+
+    Con 8 bandas son 96 bytes de claves más el texto y 8 bytes de desplazamiento
+    por empresa: unos 150-200 MB por millón de empresas con nombres típicos, más
+    una copia temporal de las corridas que se están fusionando. Ninguna consulta
+    puntúa más de bandas * max_por_cubeta candidatos.
+
+    Abierto con abrir(ruta), cada inserción se anota además en un registro
+    JSONL (<ruta>.log) que se reproduce al arrancar: una caída no pierde las
+    empresas añadidas desde la última instantánea. Cada LIMITE_REGISTRO
+    anotaciones se escribe una instantánea nueva en segundo plano y el
+    registro se recorta.
+    """
+    LIMITE_PENDIENTES = 4096
+    LIMITE_REGISTRO = 65536
+    VERSION = 3
+
+    def __init__(self, num_permutaciones: int = 32, bandas: int = 8,
+                 umbral: float = 0.8, max_por_cubeta: int = 32, semilla: int = 42):
+        if num_permutaciones % bandas != 0:
+            raise ValueError("num_permutaciones debe ser múltiplo de bandas")
+        self.num_permutaciones = num_permutaciones
+        self.bandas = bandas
+        self.filas = num_permutaciones // bandas
+        self.umbral = umbral
+        self.max_por_cubeta = max_por_cubeta
+        self.semilla = semilla
+        # Hash multiplicativo (a * h + b) mod 2^64 con a impar; numpy desborda módulo 2^64
+        generador = random.Random(semilla)
+        self._a = np.array([generador.getrandbits(64) | 1 for _ in range(num_permutaciones)], dtype=np.uint64)
+        self._b = np.array([generador.getrandbits(64) for _ in range(num_permutaciones)], dtype=np.uint64)
+        # Las claves de banda combinan sus filas con aritmética módulo 2^64
+        self._multiplicadores = np.array([pow(0x9E3779B97F4A7C15, i, 1 << 64) for i in range(self.filas)],
+                                         dtype=np.uint64)
+        # Los bits bajos de cada clave identifican su banda: todas las bandas comparten corridas
+        self._bits_banda = (bandas - 1).bit_length()
+        self._numeros_banda = np.arange(bandas, dtype=np.int64)
+        
+        self._textos = bytearray()
+        self._desplazamientos = array("Q", [0])
+        # (claves ordenadas, posiciones) de la más antigua a la más reciente
+        self._corridas = []
+        self._consolidadas = 0
+        self._pendientes = np.empty((bandas, self.LIMITE_PENDIENTES), dtype=np.int64)
+        self._num_pendientes = 0
+        self._lock = threading.RLock()
+        self._lock_fusion = threading.Lock()
+        # Registro de inserciones para no perderlas ante una caída (ver abrir)
+        self._ruta = None
+        self._registro = None
+        self._anotaciones = 0
+        self._lock_guardado = threading.Lock()
+        self._guardado_programado = False
+
+    def __len__(self) -> int:
+        return len(self._desplazamientos) - 1
+
+    def _firma(self, grams: frozenset) -> np.ndarray:
+        """Firma MinHash de un conjunto de trigramas"""
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+        return (np.outer(self._a, hashes) + self._b[:, None]).min(axis=1)
+
+    def _claves_bandas(self, firma: np.ndarray) -> np.ndarray:
+        claves = (firma.reshape(self.bandas, self.filas) * self._multiplicadores).sum(axis=1).view(np.int64)
+        return ((claves >> self._bits_banda) << self._bits_banda) | self._numeros_banda
+
+    def _preparar(self, empresa: str) -> Optional[tuple]:
+        """Trigramas y claves LSH de un nombre, o None si queda vacío al normalizar"""
+        normalizado = normalizar_empresa(empresa)
+        # Un nombre vacío tras normalizar no identifica a ninguna empresa
+        if not normalizado:
+            return None
+        grams = trigramas(normalizado)
+        return grams, self._claves_bandas(self._firma(grams))
+
+    def _entrada(self, posicion: int) -> tuple:
+        inicio, fin = self._desplazamientos[posicion], self._desplazamientos[posicion + 1]
+        lead_id, empresa = self._textos[inicio:fin].decode("utf-8").split("\0", 1)
+        return lead_id, empresa
+
+    def _insertar(self, lead_id: str, empresa: str, claves: np.ndarray) -> bool:
+        """Añade una entrada; devuelve True si se creó una corrida nueva que conviene fusionar"""
+        posicion = len(self)
+        self._textos += f"{lead_id}\0{empresa}".encode("utf-8")
+        self._desplazamientos.append(len(self._textos))
+        if self._registro is not None:
+            self._anotar(posicion, lead_id, empresa)
+        self._pendientes[:, self._num_pendientes] = claves
+        self._num_pendientes += 1
+        if self._num_pendientes == self.LIMITE_PENDIENTES:
+            self._sellar()
+            return True
+        return False
+
+    def _anotar(self, posicion: int, lead_id: str, empresa: str):
+        """Añade la inserción al registro; un fallo de disco no impide usar el índice en memoria"""
+        try:
+            linea = json.dumps([posicion, lead_id, empresa], ensure_ascii=False) + "\n"
+            self._registro.write(linea.encode("utf-8"))
+            self._registro.flush()
+            self._anotaciones += 1
+        except OSError:
+            logger.exception("Error anotando la empresa del lead %s en %s.log", lead_id, self._ruta)
+
+    def _despues_de_insertar(self, sellada: bool):
+        """Trabajo que no debe hacerse con el lock de consultas tomado"""
+        if sellada:
+            self._programar_compactacion()
+        if (self._registro is not None and self._anotaciones >= self.LIMITE_REGISTRO
+                and not self._guardado_programado):
+            self._guardado_programado = True
+            self._programar_guardado()
+
+    def _sellar(self):
+        """Convierte las claves pendientes en una corrida ordenada"""
+        n = self._num_pendientes
+        if n == 0:
+            return
+        claves = self._pendientes[:, :n].ravel()
+        # Orden estable: en cada cubeta las empresas quedan por antigüedad
+        orden = np.argsort(claves, kind="stable")
+        posiciones = (orden % n + self._consolidadas).astype(np.uint32)
+        self._corridas = self._corridas + [(claves[orden], posiciones)]
+        self._consolidadas += n
+        self._num_pendientes = 0
+
+    @staticmethod
+    def _fusionar_corridas(antigua: tuple, reciente: tuple) -> tuple:
+        """Mezcla dos corridas ordenadas; ante claves iguales la antigua va primero"""
+        claves = np.concatenate([antigua[0], reciente[0]])
+        # El orden estable detecta las dos secuencias ya ordenadas y sólo las mezcla
+        orden = np.argsort(claves, kind="stable")
+        return claves[orden], np.concatenate([antigua[1], reciente[1]])[orden]
+
+    def _programar_compactacion(self):
+        """Fusiona en un hilo aparte: ni las consultas ni la inserción que selló esperan"""
+        threading.Thread(target=self._compactar, name="compactar-indice-empresas", daemon=True).start()
+
+    def _compactar(self):
+        """Fusiona corridas vecinas hasta que cada una sea al menos el doble que la siguiente
+
+        Se ejecuta sin el lock de consultas. Si otro hilo ya está fusionando no se
+        espera: esa fusión o la siguiente corrida sellada recogerán las nuevas.
+        """
+        if not self._lock_fusion.acquire(blocking=False):
+            return
+        try:
+            while True:
+                with self._lock:
+                    corridas = self._corridas
+                i = next((i for i in range(len(corridas) - 1, 0, -1)
+                          if len(corridas[i - 1][0]) < 2 * len(corridas[i][0])), None)
+                if i is None:
+                    return
+                fusionada = self._fusionar_corridas(corridas[i - 1], corridas[i])
+                with self._lock:
+                    # Mientras se fusionaba sólo pudieron añadirse corridas al final
+                    self._corridas = self._corridas[:i - 1] + [fusionada] + self._corridas[i + 1:]
+        finally:
+            self._lock_fusion.release()
+
+    def _candidatos(self, claves: np.ndarray) -> set:
+        """Posiciones de las empresas más antiguas de cada cubeta (hasta max_por_cubeta por banda)"""
+        limite = self.max_por_cubeta
+        por_banda = [[] for _ in range(self.bandas)]
+        for claves_corrida, posiciones_corrida in self._corridas:
+            inicios = np.searchsorted(claves_corrida, claves, side="left")
+            fines = np.searchsorted(claves_corrida, claves, side="right")
+            for banda in np.flatnonzero(fines > inicios).tolist():
+                faltan = limite - len(por_banda[banda])
+                if faltan > 0:
+                    inicio = int(inicios[banda])
+                    fin = min(int(fines[banda]), inicio + faltan)
+                    por_banda[banda].extend(posiciones_corrida[inicio:fin].tolist())
+        if self._num_pendientes:
+            coincidencias = self._pendientes[:, :self._num_pendientes] == claves[:, None]
+            for banda in np.flatnonzero(coincidencias.any(axis=1)).tolist():
+                faltan = limite - len(por_banda[banda])
+                if faltan > 0:
+                    recientes = np.flatnonzero(coincidencias[banda])[:faltan]
+                    por_banda[banda].extend((recientes + self._consolidadas).tolist())
+        return set().union(*por_banda)
+
+    def _mejor_coincidencia(self, grams: frozenset, claves: np.ndarray) -> Optional[Dict]:
+        with self._lock:
+            # En caso de empate gana el lead más antiguo
+            mejor = None
+            mejor_similitud = 0.0
+            for posicion in sorted(self._candidatos(claves)):
+                lead_id, candidata = self._entrada(posicion)
+                similitud = similitud_jaccard(grams, trigramas(normalizar_empresa(candidata)))
+                if similitud > mejor_similitud:
+                    mejor = (lead_id, candidata)
+                    mejor_similitud = similitud
+        
+        if mejor is None or mejor_similitud < self.umbral:
+            return None
+        return {"lead_id": mejor[0], "empresa": mejor[1], "similitud": round(mejor_similitud, 3)}
+
+    def buscar(self, empresa: str) -> Optional[Dict]:
+        """Devuelve el lead existente más parecido por encima del umbral, o None"""
+        preparado = self._preparar(empresa)
+        if preparado is None:
+            return None
+        return self._mejor_coincidencia(*preparado)
+
+    def agregar(self, lead_id: str, empresa: str):
+        """Añade una empresa al índice; los nombres vacíos tras normalizar se ignoran"""
+        preparado = self._preparar(empresa)
+        if preparado is None:
+            return
+        with self._lock:
+            sellada = self._insertar(lead_id, empresa, preparado[1])
+        self._despues_de_insertar(sellada)
+
+    def buscar_o_agregar(self, lead_id: str, empresa: str) -> Optional[Dict]:
+        """Busca un duplicado; si no lo hay, registra la empresa con este lead_id"""
+        preparado = self._preparar(empresa)
+        if preparado is None:
+            return None
+        sellada = False
+        with self._lock:
+            duplicado = self._mejor_coincidencia(*preparado)
+            if duplicado is None:
+                sellada = self._insertar(lead_id, empresa, preparado[1])
+        self._despues_de_insertar(sellada)
+        return duplicado
+
+    def guardar(self, ruta: Optional[str] = None):
+        """Persiste el índice en disco como un único archivo .npz sin comprimir
+
+        Sin ruta se usa la de abrir(); en ese caso el registro se recorta a las
+        inserciones posteriores a la instantánea. Las consultas sólo esperan
+        mientras se copia el estado, no mientras se escribe el archivo.
+        """
+        ruta = ruta or self._ruta
+        if ruta is None:
+            raise ValueError("Falta la ruta del índice: use guardar(ruta) o IndiceEmpresas.abrir(ruta)")
+        with self._lock_guardado:
+            with self._lock:
+                self._sellar()
+                parametros = {
+                    "version": self.VERSION,
+                    "num_permutaciones": self.num_permutaciones,
+                    "bandas": self.bandas,
+                    "umbral": self.umbral,
+                    "max_por_cubeta": self.max_por_cubeta,
+                    "semilla": self.semilla,
+                    "corridas": len(self._corridas),
+                }
+                arrays = {
+                    "parametros": np.frombuffer(json.dumps(parametros).encode("utf-8"), dtype=np.uint8),
+                    "textos": np.frombuffer(bytes(self._textos), dtype=np.uint8),
+                    "desplazamientos": np.frombuffer(self._desplazamientos.tobytes(), dtype=np.uint64),
+                }
+                # Las corridas son inmutables: basta con las referencias
+                for i, (claves, posiciones) in enumerate(self._corridas):
+                    arrays[f"claves_{i}"] = claves
+                    arrays[f"posiciones_{i}"] = posiciones
+                recortar = self._registro is not None and ruta == self._ruta
+                if recortar:
+                    # Todo lo anotado hasta aquí queda en la instantánea
+                    anotado = self._registro.tell()
+                    anotaciones = self._anotaciones
+            with open(f"{ruta}.tmp", "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(f"{ruta}.tmp", ruta)
+            if recortar:
+                self._recortar_registro(anotado, anotaciones)
+
+    def _recortar_registro(self, anotado: int, anotaciones: int):
+        """Deja en el registro sólo lo anotado después de la posición `anotado`"""
+        ruta_registro = f"{self._ruta}.log"
+        with self._lock:
+            self._registro.close()
+            with open(ruta_registro, "rb") as f:
+                f.seek(anotado)
+                resto = f.read()
+            with open(f"{ruta_registro}.tmp", "wb") as f:
+                f.write(resto)
+            os.replace(f"{ruta_registro}.tmp", ruta_registro)
+            self._registro = open(ruta_registro, "ab")
+            self._anotaciones -= anotaciones
+
+    def _programar_guardado(self):
+        """Escribe la instantánea en un hilo aparte"""
+        def guardar():
+            try:
+                self.guardar()
+            except Exception:
+                logger.exception("Error guardando el índice de empresas en %s", self._ruta)
+            finally:
+                self._guardado_programado = False
+        threading.Thread(target=guardar, name="guardar-indice-empresas", daemon=True).start()
+
+    def cerrar(self):
+        """Escribe una última instantánea (si se abrió con abrir()) y cierra el registro"""
+        if self._ruta is None:
+            return
+        self.guardar()
+        with self._lock:
+            self._registro.close()
+            self._registro = None
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "IndiceEmpresas":
+        """Carga un índice guardado con guardar() sin recalcular firmas"""
+        with np.load(ruta, allow_pickle=False) as datos:
+            parametros = json.loads(datos["parametros"].tobytes().decode("utf-8"))
+            if parametros.get("version") != cls.VERSION:
+                raise ValueError(f"Versión de índice no soportada: {parametros.get('version')}")
+            indice = cls(
+                num_permutaciones=parametros["num_permutaciones"],
+                bandas=parametros["bandas"],
+                umbral=parametros["umbral"],
+                max_por_cubeta=parametros["max_por_cubeta"],
+                semilla=parametros["semilla"],
+            )
+            indice._textos = bytearray(datos["textos"].tobytes())
+            indice._desplazamientos = array("Q")
+            indice._desplazamientos.frombytes(datos["desplazamientos"].tobytes())
+            indice._corridas = [(datos[f"claves_{i}"], datos[f"posiciones_{i}"])
+                                for i in range(parametros["corridas"])]
+        indice._consolidadas = len(indice)
+        if sum(len(claves) for claves, _ in indice._corridas) != indice._consolidadas * indice.bandas:
+            raise ValueError(f"Claves LSH inconsistentes con las entradas en {ruta}")
+        return indice
+
+    @classmethod
+    def abrir(cls, ruta: str) -> "IndiceEmpresas":
+        """Carga la instantánea de `ruta` (si existe), reproduce su registro y sigue anotando en él"""
+        indice = cls.cargar(ruta) if os.path.exists(ruta) else cls()
+        ruta_registro = f"{ruta}.log"
+        reproducidas = indice._reproducir_registro(ruta_registro) if os.path.exists(ruta_registro) else 0
+        indice._ruta = ruta
+        indice._registro = open(ruta_registro, "ab")
+        if reproducidas or os.path.getsize(ruta_registro):
+            # Una instantánea nueva evita volver a reproducir lo mismo en el siguiente
+            # arranque y recorta una posible última línea a medias
+            indice.guardar()
+        return indice
+
+    def _reproducir_registro(self, ruta_registro: str) -> int:
+        """Vuelve a insertar las anotaciones que no están en la instantánea cargada"""
+        en_instantanea = len(self)
+        reproducidas = 0
+        with open(ruta_registro, "r", encoding="utf-8", errors="replace") as f:
+            for numero, linea in enumerate(f, start=1):
+                try:
+                    posicion, lead_id, empresa = json.loads(linea)
+                except ValueError:
+                    # Típicamente la última línea, a medias si el proceso murió escribiéndola
+                    logger.warning("Línea %d ilegible en %s; se ignora", numero, ruta_registro)
+                    continue
+                if posicion >= en_instantanea:
+                    self.agregar(lead_id, empresa)
+                    reproducidas += 1
+        return reproducidas
+
+# Ruta opcional para persistir el índice entre reinicios
+RUTA_INDICE_EMPRESAS = os.getenv("SHERLOCK_INDICE_EMPRESAS")
+
+def _cargar_indice_empresas() -> IndiceEmpresas:
+    if RUTA_INDICE_EMPRESAS:
+        try:
+            return IndiceEmpresas.abrir(RUTA_INDICE_EMPRESAS)
+        except Exception:
+            logger.exception("Error cargando índice de empresas desde %s", RUTA_INDICE_EMPRESAS)
+    return IndiceEmpresas()
+
+_indice_empresas: Optional[IndiceEmpresas] = None
+_lock_indice_empresas = threading.Lock()
+
+def obtener_indice_empresas() -> IndiceEmpresas:
+    """Índice del servicio; se carga en el primer uso para que importar main no lo cargue
+
+    Los procesos del simulador importan main: con una carga al importar, cada uno
+    tendría su propia copia del índice persistido en memoria.
+    """
+    global _indice_empresas
+    with _lock_indice_empresas:
+        if _indice_empresas is None:
+            _indice_empresas = _cargar_indice_empresas()
+        return _indice_empresas
+
+# Almacén columnar de leads analizados
+#
+# Cada columna es un archivo binario de ancho fijo (<columna>.bin) al que se
+# añade una fila por lead; las columnas categóricas guardan códigos enteros y
+# sus valores viven en diccionarios.json. Las consultas mapean los archivos en
+# memoria y agregan con operaciones vectorizadas de numpy.
+EPOCH = datetime(1970, 1, 1)
+SEGUNDOS_DIA = 86400
+# El 1970-01-01 fue jueves: se desplaza 3 días para que las semanas empiecen en lunes
+DESPLAZAMIENTO_SEMANA = 3 * SEGUNDOS_DIA
+
+# nombre -> formato struct (también válido como dtype de numpy)
+COLUMNAS_NUMERICAS = {
+    "timestamp": "<q",  # segundos desde EPOCH, hora local
+    "score_total": "<f",
+    "score_financiero": "<B",
+    "score_tamano": "<B",
+    "score_presupuesto": "<B",
+    "score_urgencia": "<f",
+    "score_autoridad": "<B",
+    "potencial_ingresos": "<d",
+    # entradas de calcular_scoring, para volver a puntuar con otras reglas
+    "facturacion_anual": "<d",
+    "empleados": "<q",
+    "presupuesto_marketing": "<d",
+    "urgencia": "<q",
+    "decision_maker": "<B",
+}
+COLUMNAS_CATEGORICAS = {
+    "clasificacion": "<B",
+    "industria": "<I",
+}
+METRICAS_PROMEDIO = ("score_total", "score_financiero", "score_tamano",
+                     "score_presupuesto", "score_urgencia", "score_autoridad")
+METRICAS_SUMA = ("potencial_ingresos",)
+DIMENSIONES = ("clasificacion", "industria", "dia", "semana")
+
+class AlmacenLeads:
+    """Almacén columnar en disco de leads analizados, consultado vía mmap
+
+    Con solo_lectura=True no se modifica nada en disco: sirve para leer el
+    almacén de un servicio en marcha (p. ej. desde el simulador por línea de
+    comandos) mientras éste sigue añadiendo filas.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directorio: str, solo_lectura: bool = False):
+        self.directorio = directorio
+        self.solo_lectura = solo_lectura
+        if not solo_lectura:
+            os.makedirs(directorio, exist_ok=True)
+        self._formatos = {**COLUMNAS_NUMERICAS, **COLUMNAS_CATEGORICAS}
+        registradas, self._diccionarios = self._cargar_manifiesto()
+        self._codigos = {columna: {valor: codigo for codigo, valor in enumerate(valores)}
+                         for columna, valores in self._diccionarios.items()}
+        self._archivos = {}
+        self._mapas = {}
+        self._lock = threading.Lock()
+        if solo_lectura:
+            self.filas = self._contar_filas(registradas)
+        else:
+            self.filas = self._recuperar_filas(registradas)
+            self._guardar_manifiesto()
+
+    def _ruta(self, columna: str) -> str:
+        return os.path.join(self.directorio, f"{columna}.bin")
+
+    def _cargar_manifiesto(self) -> tuple:
+        """Columnas registradas ({nombre: formato}) y diccionarios de las categóricas
+
+        diccionarios.json guarda la versión del formato, las columnas que
+        existen en disco y los valores de cada columna categórica.
+        """
+        ruta = os.path.join(self.directorio, "diccionarios.json")
+        diccionarios = {columna: [] for columna in COLUMNAS_CATEGORICAS}
+        if not os.path.exists(ruta):
+            # Sin manifiesto sólo puede tratarse de un almacén nuevo
+            if any(os.path.exists(self._ruta(columna)) for columna in self._formatos):
+                raise ValueError(f"Almacén sin diccionarios.json en {self.directorio}")
+            return {}, diccionarios
+        with open(ruta, "r", encoding="utf-8") as f:
+            manifiesto = json.load(f)
+        if manifiesto.get("version") != self.VERSION:
+            raise ValueError(f"Versión de almacén no soportada: {manifiesto.get('version')}")
+        diccionarios.update(manifiesto["diccionarios"])
+        return manifiesto["columnas"], diccionarios
+
+    def _guardar_manifiesto(self):
+        ruta = os.path.join(self.directorio, "diccionarios.json")
+        manifiesto = {
+            "version": self.VERSION,
+            "columnas": self._formatos,
+            "diccionarios": self._diccionarios,
+        }
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f, ensure_ascii=False)
+        os.replace(f"{ruta}.tmp", ruta)
+
+    def _tamanos_columnas(self, registradas: Dict[str, str]) -> Dict[str, int]:
+        """Tamaño en bytes de cada columna, que debe estar registrada con su formato actual
+
+        Las columnas ausentes no se rellenan: los leads anteriores no tienen esos
+        datos y unos ceros se tomarían por valores reales (p. ej. en el simulador).
+        """
+        tamanos = {}
+        for columna, formato in self._formatos.items():
+            if columna not in registradas:
+                raise ValueError(f"La columna '{columna}' no está en el almacén {self.directorio}; "
+                                 f"un almacén con otras columnas debe migrarse antes de abrirlo")
+            if registradas[columna] != formato:
+                raise ValueError(f"La columna '{columna}' está guardada como {registradas[columna]}, "
+                                 f"se esperaba {formato}")
+            if not os.path.exists(self._ruta(columna)):
+                raise ValueError(f"Falta el archivo de la columna registrada '{columna}' en {self.directorio}")
+            tamanos[columna] = os.path.getsize(self._ruta(columna))
+        return tamanos
+
+    def _recuperar_filas(self, registradas: Dict[str, str]) -> int:
+        """Número de filas completas del almacén
+
+        Sólo se descarta la última fila si quedó a medias (una escritura
+        interrumpida); cualquier otra diferencia entre columnas es un error.
+        """
+        if not registradas:
+            # Almacén nuevo: se crean las columnas vacías que registra el manifiesto
+            for columna in self._formatos:
+                open(self._ruta(columna), "ab").close()
+            return 0
+        tamanos = self._tamanos_columnas(registradas)
+        filas = min(tamano // struct.calcsize(self._formatos[columna]) for columna, tamano in tamanos.items())
+        for columna, tamano in tamanos.items():
+            ancho = struct.calcsize(self._formatos[columna])
+            sobrante = tamano - filas * ancho
+            if sobrante > ancho:
+                raise ValueError(f"La columna '{columna}' tiene {sobrante} bytes más que el resto; "
+                                 f"el almacén en {self.directorio} está inconsistente")
+            if sobrante:
+                os.truncate(self._ruta(columna), filas * ancho)
+        return filas
+
+    def _contar_filas(self, registradas: Dict[str, str]) -> int:
+        """Filas completas en todas las columnas, sin truncar nada
+
+        Un servicio en marcha puede tener una fila escrita sólo en parte de las
+        columnas: se toma el mínimo y esa fila queda fuera de la lectura.
+        """
+        if not registradas:
+            raise ValueError(f"No hay un almacén de leads en {self.directorio}")
+        return min(tamano // struct.calcsize(self._formatos[columna])
+                   for columna, tamano in self._tamanos_columnas(registradas).items())
+
+    def _codificar(self, columna: str, valor: str) -> int:
+        codigo = self._codigos[columna].get(valor)
+        if codigo is None:
+            codigo = len(self._diccionarios[columna])
+            self._diccionarios[columna].append(valor)
+            self._codigos[columna][valor] = codigo
+            self._guardar_manifiesto()
+        return codigo
+
+    def agregar(self, lead: LeadData, scoring: Dict, diagnostico: Dict, momento: datetime):
+        """Añade una fila con el resultado del análisis de un lead"""
+        if self.solo_lectura:
+            raise ValueError(f"El almacén {self.directorio} está abierto en modo de sólo lectura")
+        with self._lock:
+            valores = {
+                "timestamp": self._segundos(momento),
+                "score_total": scoring["score_total"],
+                "score_financiero": scoring["score_financiero"],
+                "score_tamano": scoring["score_tamano"],
+                "score_presupuesto": scoring["score_presupuesto"],
+                "score_urgencia": scoring["score_urgencia"],
+                "score_autoridad": scoring["score_autoridad"],
+                "potencial_ingresos": diagnostico["potencial_ingresos"],
+                "facturacion_anual": lead.facturacion_anual,
+                "empleados": lead.empleados,
+                "presupuesto_marketing": lead.presupuesto_marketing,
+                "urgencia": lead.urgencia,
+                "decision_maker": lead.decision_maker,
+                "clasificacion": self._codificar("clasificacion", scoring["clasificacion"]),
+                "industria": self._codificar("industria", lead.industria.strip().lower()),
+            }
+            # Se empaquetan todos los valores antes de escribir nada: un valor fuera de
+            # rango (p. ej. empleados >= 2**63) no debe dejar columnas desalineadas
+            fila = {columna: struct.pack(formato, valores[columna])
+                    for columna, formato in self._formatos.items()}
+            try:
+                for columna, datos in fila.items():
+                    archivo = self._archivos.get(columna)
+                    if archivo is None:
+                        archivo = self._archivos[columna] = open(self._ruta(columna), "ab")
+                    archivo.write(datos)
+                    archivo.flush()
+            except Exception:
+                self._descartar_fila_incompleta()
+                raise
+            self.filas += 1
+
+    def _descartar_fila_incompleta(self):
+        """Devuelve todas las columnas a self.filas filas tras una escritura fallida"""
+        for columna, formato in self._formatos.items():
+            archivo = self._archivos.pop(columna, None)
+            if archivo is not None:
+                try:
+                    archivo.close()
+                except OSError:
+                    pass
+            ruta = self._ruta(columna)
+            if os.path.exists(ruta):
+                os.truncate(ruta, self.filas * struct.calcsize(formato))
+
+    def cerrar(self):
+        with self._lock:
+            for archivo in self._archivos.values():
+                archivo.close()
+            self._archivos = {}
+            self._mapas = {}
+
+    def _columna(self, columna: str, filas: int):
+        """Vista de sólo lectura de las primeras `filas` filas de una columna"""
+        dtype = np.dtype(self._formatos[columna])
+        if filas == 0:
+            return np.empty(0, dtype=dtype)
+        # Los mapas sólo crecen: se reutiliza el último si cubre las filas pedidas
+        mapa = self._mapas.get(columna)
+        if mapa is None or len(mapa) < filas:
+            mapa = self._mapas[columna] = np.memmap(self._ruta(columna), dtype=dtype,
+                                                    mode="r", shape=(filas,))
+        return mapa[:filas]
+
+    def poblacion(self) -> Dict[str, np.ndarray]:
+        """Entradas de scoring de todos los leads almacenados, mapeadas en memoria"""
+        filas = self.filas
+        return {columna: self._columna(columna, filas) for columna in CAMPOS_POBLACION}
+
+    @staticmethod
+    def _segundos(momento: datetime) -> int:
+        if momento.tzinfo is not None:
+            momento = momento.astimezone().replace(tzinfo=None)
+        return int((momento - EPOCH).total_seconds())
+
+    def _dimension(self, dimension: str, filas: int, mascara):
+        """Códigos densos (0..cardinalidad-1) de una dimensión y cómo etiquetarlos"""
+        if dimension in COLUMNAS_CATEGORICAS:
+            valores = self._diccionarios[dimension]
+            codigos = self._filtrar(self._columna(dimension, filas), mascara).astype(np.int64)
+            return codigos, len(valores), lambda codigo: valores[codigo]
+        paso = SEGUNDOS_DIA if dimension == "dia" else 7 * SEGUNDOS_DIA
+        desplazamiento = 0 if dimension == "dia" else DESPLAZAMIENTO_SEMANA
+        periodos = (self._filtrar(self._columna("timestamp", filas), mascara) + desplazamiento) // paso
+        base = int(periodos.min()) if len(periodos) else 0
+        codigos = periodos - base
+        cardinalidad = int(codigos.max()) + 1 if len(codigos) else 0
+        etiquetar = lambda codigo: (EPOCH + timedelta(
+            seconds=(base + codigo) * paso - desplazamiento)).date().isoformat()
+        return codigos, cardinalidad, etiquetar
+
+    @staticmethod
+    def _filtrar(columna, mascara):
+        return columna if mascara is None else columna[mascara]
+
+    def estadisticas(self, agrupar_por: List[str] = (), desde: Optional[datetime] = None,
+                     hasta: Optional[datetime] = None, clasificacion: Optional[str] = None,
+                     industria: Optional[str] = None) -> Dict:
+        """Conteos, promedios de score y totales de ingresos por grupo
+
+        :param agrupar_por: dimensiones de DIMENSIONES, en orden.
+        :param desde: inicio inclusivo del rango de fechas.
+        :param hasta: fin exclusivo del rango de fechas.
+        """
+        for dimension in agrupar_por:
+            if dimension not in DIMENSIONES:
+                raise ValueError(f"Dimensión desconocida '{dimension}'. Opciones: {', '.join(DIMENSIONES)}")
+        filas = self.filas
+        
+        # Sin filtros se trabaja directamente sobre las columnas mapeadas
+        mascara = None
+        def restringir(condicion):
+            nonlocal mascara
+            mascara = condicion if mascara is None else mascara & condicion
+        if desde is not None:
+            restringir(self._columna("timestamp", filas) >= self._segundos(desde))
+        if hasta is not None:
+            restringir(self._columna("timestamp", filas) < self._segundos(hasta))
+        for columna, valor in (("clasificacion", clasificacion), ("industria", industria)):
+            if valor is not None:
+                codigo = self._codigos[columna].get(valor.strip().lower() if columna == "industria" else valor)
+                if codigo is None:
+                    restringir(np.zeros(filas, dtype=bool))
+                else:
+                    restringir(self._columna(columna, filas) == codigo)
+        seleccionadas = filas if mascara is None else int(np.count_nonzero(mascara))
+        
+        # Combinar las dimensiones en una sola clave entera densa por fila
+        clave = np.zeros(seleccionadas, dtype=np.int64)
+        dimensiones = []
+        total_claves = 1
+        for dimension in agrupar_por:
+            codigos, cardinalidad, etiquetar = self._dimension(dimension, filas, mascara)
+            clave = clave * cardinalidad + codigos
+            total_claves *= cardinalidad
+            dimensiones.append((dimension, cardinalidad, etiquetar))
+        
+        # Con pocas combinaciones posibles se agrega por índice directo; si no,
+        # se compactan primero las claves presentes
+        denso = total_claves <= max(seleccionadas, 1 << 20)
+        if denso:
+            indice_grupo = clave
+            conteo = np.bincount(indice_grupo, minlength=total_claves)
+            grupos = np.flatnonzero(conteo)
+            conteo = conteo[grupos]
+        else:
+            grupos, indice_grupo, conteo = np.unique(clave, return_inverse=True, return_counts=True)
+            indice_grupo = indice_grupo.reshape(-1)
+        sumas = {}
+        for columna in METRICAS_PROMEDIO + METRICAS_SUMA:
+            pesos = self._filtrar(self._columna(columna, filas), mascara)
+            if denso:
+                sumas[columna] = np.bincount(indice_grupo, weights=pesos, minlength=total_claves)[grupos]
+            else:
+                sumas[columna] = np.bincount(indice_grupo, weights=pesos, minlength=len(grupos))
+        
+        resultado = []
+        for g, clave_grupo in enumerate(grupos.tolist()):
+            grupo = {}
+            for dimension, cardinalidad, etiquetar in reversed(dimensiones):
+                clave_grupo, codigo = divmod(clave_grupo, cardinalidad)
+                grupo[dimension] = etiquetar(codigo)
+            grupo = {dimension: grupo[dimension] for dimension in agrupar_por}
+            grupo["conteo"] = int(conteo[g])
+            for columna in METRICAS_PROMEDIO:
+                grupo[f"{columna}_promedio"] = round(float(sumas[columna][g] / conteo[g]), 2)
+            for columna in METRICAS_SUMA:
+                grupo[f"{columna}_total"] = round(float(sumas[columna][g]), 2)
+            resultado.append(grupo)
+        
+        return {"total": seleccionadas, "grupos": resultado}
+
+RUTA_ALMACEN_LEADS = os.getenv("SHERLOCK_ALMACEN_LEADS", "data/almacen_leads")
+_almacen_leads: Optional[AlmacenLeads] = None
+_lock_almacen_leads = threading.Lock()
+
+def obtener_almacen_leads() -> AlmacenLeads:
+    """Almacén del servicio; se abre en el primer uso para que importar main no cree archivos"""
+    global _almacen_leads
+    with _lock_almacen_leads:
+        if _almacen_leads is None:
+            _almacen_leads = AlmacenLeads(RUTA_ALMACEN_LEADS)
+        return _almacen_leads
+
+# Simulador de reglas de scoring
+#
+# Reevalúa toda la base de leads con reglas candidatas de forma vectorizada y
+# compara la clasificación y la distribución de scores con las reglas actuales.
+class ReglasScoring(BaseModel):
+    """Parámetros de calcular_scoring; los valores por defecto son las reglas actuales
+
+    Los umbrales van de mayor a menor y cada lista de puntos tiene un elemento
+    más que sus umbrales (el valor cuando no se alcanza ninguno).
+    """
+    nombre: str = "actual"
+    umbrales_facturacion: List[float] = [1000000, 500000, 100000]
+    puntos_facturacion: List[float] = [30, 20, 15, 5]
+    umbrales_empleados: List[float] = [100, 50, 10]
+    puntos_empleados: List[float] = [20, 15, 10, 5]
+    umbrales_ratio_marketing: List[float] = [0.1, 0.05, 0.02]
+    puntos_presupuesto: List[float] = [25, 20, 15, 5]
+    puntos_urgencia_max: float = 15
+    puntos_decisor: float = 10
+    puntos_no_decisor: float = 3
+    umbral_hot: float = 80
+    umbral_warm: float = 60
+    umbral_cold: float = 40
+
+    def validar(self):
+        for factor in ("facturacion", "empleados"):
+            self._validar_tramos(factor, getattr(self, f"umbrales_{factor}"), getattr(self, f"puntos_{factor}"))
+        self._validar_tramos("presupuesto", self.umbrales_ratio_marketing, self.puntos_presupuesto)
+        if not self.umbral_hot >= self.umbral_warm >= self.umbral_cold:
+            raise ValueError(f"Reglas '{self.nombre}': se requiere umbral_hot >= umbral_warm >= umbral_cold")
+
+    def _validar_tramos(self, factor: str, umbrales: List[float], puntos: List[float]):
+        if len(puntos) != len(umbrales) + 1:
+            raise ValueError(f"Reglas '{self.nombre}': puntos_{factor} debe tener {len(umbrales) + 1} valores")
+        if any(a < b for a, b in zip(umbrales, umbrales[1:])):
+            raise ValueError(f"Reglas '{self.nombre}': los umbrales de {factor} deben ir de mayor a menor")
+
+class SimulacionRequest(BaseModel):
+    reglas: List[ReglasScoring]
+    procesos: Optional[int] = None
+
+# Campos de LeadData que usa calcular_scoring
+CAMPOS_POBLACION = ("facturacion_anual", "empleados", "presupuesto_marketing", "urgencia", "decision_maker")
+PERCENTILES = (10, 25, 50, 75, 90)
+BORDES_HISTOGRAMA = list(range(0, 101, 10)) + [float("inf")]
+
+def poblacion_desde_leads(leads: List[Dict]) -> Dict[str, np.ndarray]:
+    """Columnas de scoring a partir de leads en forma de dict (p. ej. un export JSONL)"""
+    return {
+        "facturacion_anual": np.array([l["facturacion_anual"] for l in leads], dtype=np.float64),
+        "empleados": np.array([l["empleados"] for l in leads], dtype=np.int64),
+        "presupuesto_marketing": np.array([l["presupuesto_marketing"] for l in leads], dtype=np.float64),
+        "urgencia": np.array([l["urgencia"] for l in leads], dtype=np.int64),
+        "decision_maker": np.array([bool(l["decision_maker"]) for l in leads], dtype=bool),
+    }
+
+def _puntos_por_tramos(valores: np.ndarray, umbrales: List[float], puntos: List[float]) -> np.ndarray:
+    """Equivalente vectorizado de la cadena if/elif de calcular_scoring"""
+    return np.select([valores >= u for u in umbrales], puntos[:-1], default=puntos[-1]).astype(np.float64)
+
+def calcular_scoring_vectorizado(poblacion: Dict[str, np.ndarray], reglas: ReglasScoring) -> Dict[str, np.ndarray]:
+    """score_total y código de clasificación (índice en CLASIFICACIONES) de cada lead"""
+    facturacion = poblacion["facturacion_anual"].astype(np.float64)
+    presupuesto = poblacion["presupuesto_marketing"].astype(np.float64)
+    ratio_marketing = np.divide(presupuesto, facturacion, out=np.zeros_like(facturacion),
+                                where=facturacion > 0)
+    
+    # Mismo orden de suma que calcular_scoring para obtener los mismos flotantes
+    score_total = (
+        _puntos_por_tramos(facturacion, reglas.umbrales_facturacion, reglas.puntos_facturacion)
+        + _puntos_por_tramos(poblacion["empleados"], reglas.umbrales_empleados, reglas.puntos_empleados)
+        + _puntos_por_tramos(ratio_marketing, reglas.umbrales_ratio_marketing, reglas.puntos_presupuesto)
+        + (poblacion["urgencia"] / 10) * reglas.puntos_urgencia_max
+        + np.where(poblacion["decision_maker"].astype(bool), reglas.puntos_decisor, reglas.puntos_no_decisor)
+    )
+    clasificacion = np.select(
+        [score_total >= reglas.umbral_hot, score_total >= reglas.umbral_warm, score_total >= reglas.umbral_cold],
+        [0, 1, 2], default=3
+    ).astype(np.int64)
+    return {"score_total": score_total, "clasificacion": clasificacion}
+
+def _resumen_scores(score_total: np.ndarray, clasificacion: np.ndarray) -> Dict:
+    conteo = np.bincount(clasificacion, minlength=len(CLASIFICACIONES))
+    percentiles = np.percentile(score_total, PERCENTILES) if len(score_total) else [0.0] * len(PERCENTILES)
+    histograma, _ = np.histogram(score_total, bins=BORDES_HISTOGRAMA)
+    return {
+        "clasificacion": {c: int(n) for c, n in zip(CLASIFICACIONES, conteo)},
+        "score_promedio": round(float(score_total.mean()), 2) if len(score_total) else 0.0,
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, percentiles)},
+        "histograma": [int(n) for n in histograma],
+    }
+
+def _comparar(base: Dict[str, np.ndarray], reglas: ReglasScoring, poblacion: Dict[str, np.ndarray]) -> Dict:
+    """Matriz de transición y diferencias de distribución frente a las reglas actuales"""
+    candidata = calcular_scoring_vectorizado(poblacion, reglas)
+    n = len(CLASIFICACIONES)
+    transiciones = np.bincount(base["clasificacion"] * n + candidata["clasificacion"],
+                               minlength=n * n).reshape(n, n)
+    resumen_base = _resumen_scores(base["score_total"], base["clasificacion"])
+    resumen = _resumen_scores(candidata["score_total"], candidata["clasificacion"])
+    diferencia = candidata["score_total"] - base["score_total"]
+    
+    return {
+        "nombre": reglas.nombre,
+        # filas: clasificación actual; columnas: clasificación con las reglas candidatas
+        "transiciones": {
+            actual: {nueva: int(transiciones[i, j]) for j, nueva in enumerate(CLASIFICACIONES)}
+            for i, actual in enumerate(CLASIFICACIONES)
+        },
+        # CLASIFICACIONES va de mejor a peor: debajo de la diagonal se sube de categoría
+        "suben": int(np.tril(transiciones, -1).sum()),
+        "bajan": int(np.triu(transiciones, 1).sum()),
+        "sin_cambio": int(np.trace(transiciones)),
+        "distribucion": resumen,
+        "delta_clasificacion": {c: resumen["clasificacion"][c] - resumen_base["clasificacion"][c]
+                                for c in CLASIFICACIONES},
+        "delta_score_promedio": round(resumen["score_promedio"] - resumen_base["score_promedio"], 2),
+        "delta_percentiles": {p: round(resumen["percentiles"][p] - resumen_base["percentiles"][p], 2)
+                              for p in resumen["percentiles"]},
+        "delta_histograma": [a - b for a, b in zip(resumen["histograma"], resumen_base["histograma"])],
+        "delta_score_por_lead": {
+            "promedio_absoluto": round(float(np.abs(diferencia).mean()), 2) if len(diferencia) else 0.0,
+            "maximo": round(float(diferencia.max()), 2) if len(diferencia) else 0.0,
+            "minimo": round(float(diferencia.min()), 2) if len(diferencia) else 0.0,
+        },
+    }
+
+# Límite de reglas candidatas por simulación
+MAX_REGLAS_SIMULACION = 16
+
+_pool_simulacion: Optional[ProcessPoolExecutor] = None
+_lock_pool_simulacion = threading.Lock()
+
+def _archivo_mapeado(valores: np.ndarray) -> Optional[tuple]:
+    """(ruta, desplazamiento en bytes) si `valores` es una vista contigua de un archivo mapeado"""
+    raiz = valores
+    while isinstance(raiz.base, np.ndarray):
+        raiz = raiz.base
+    if not isinstance(raiz, np.memmap) or raiz.filename is None or not valores.flags.c_contiguous:
+        return None
+    return raiz.filename, raiz.offset + valores.ctypes.data - raiz.ctypes.data
+
+def _compartir_columnas(columnas: Dict[str, np.ndarray], directorio: str, prefijo: str) -> Dict[str, tuple]:
+    """Describe cada columna como (ruta, dtype, desplazamiento, filas) para mapearla desde otro proceso
+
+    Las columnas del almacén ya son archivos mapeados y se comparten sin copiarlas;
+    el resto se escribe una sola vez en `directorio`.
+    """
+    descriptores = {}
+    for campo, valores in columnas.items():
+        archivo = _archivo_mapeado(valores)
+        if archivo is None:
+            valores = np.ascontiguousarray(valores)
+            archivo = (os.path.join(directorio, f"{prefijo}{campo}.bin"), 0)
+            valores.tofile(archivo[0])
+        descriptores[campo] = (archivo[0], valores.dtype.str, archivo[1], len(valores))
+    return descriptores
+
+def _mapear_columnas(descriptores: Dict[str, tuple]) -> Dict[str, np.ndarray]:
+    return {
+        campo: np.memmap(ruta, dtype=dtype, mode="r", offset=desplazamiento, shape=(filas,))
+        if filas else np.empty(0, dtype=dtype)
+        for campo, (ruta, dtype, desplazamiento, filas) in descriptores.items()
+    }
+
+def _comparar_en_proceso(base: Dict[str, tuple], reglas: ReglasScoring, poblacion: Dict[str, tuple]) -> Dict:
+    return _comparar(_mapear_columnas(base), reglas, _mapear_columnas(poblacion))
+
+def obtener_pool_simulacion() -> ProcessPoolExecutor:
+    """Pool de procesos compartido por todas las simulaciones, con un proceso por CPU
+
+    Se crea una sola vez y con el contexto "spawn": hacer fork desde un worker de
+    uvicorn con varios hilos puede dejar locks tomados en el proceso hijo.
+    """
+    global _pool_simulacion
+    with _lock_pool_simulacion:
+        if _pool_simulacion is None:
+            _pool_simulacion = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+        return _pool_simulacion
+
+def cerrar_pool_simulacion():
+    global _pool_simulacion
+    with _lock_pool_simulacion:
+        if _pool_simulacion is not None:
+            _pool_simulacion.shutdown()
+            _pool_simulacion = None
+
+def simular_reglas(poblacion: Dict[str, np.ndarray], candidatas: List[ReglasScoring],
+                   procesos: Optional[int] = None) -> Dict:
+    """Compara una o más reglas candidatas con las actuales sobre una población de leads
+
+    Con varias candidatas se evalúan en paralelo en el pool compartido, con
+    como mucho `procesos` a la vez (por defecto y como máximo, el número de CPUs).
+    """
+    if len(candidatas) > MAX_REGLAS_SIMULACION:
+        raise ValueError(f"Como máximo {MAX_REGLAS_SIMULACION} reglas por simulación")
+    if procesos is not None and procesos < 1:
+        raise ValueError("procesos debe ser al menos 1")
+    for reglas in candidatas:
+        reglas.validar()
+    base = calcular_scoring_vectorizado(poblacion, ReglasScoring())
+    
+    cpus = os.cpu_count() or 1
+    procesos = min(procesos or cpus, cpus, len(candidatas))
+    if procesos > 1:
+        # Los procesos reciben sólo rutas: mapean la población y las puntuaciones
+        # actuales desde disco en lugar de recibir los arrays serializados
+        with tempfile.TemporaryDirectory(prefix="sherlock_simulacion_") as directorio:
+            base_compartida = _compartir_columnas(base, directorio, "base_")
+            poblacion_compartida = _compartir_columnas(poblacion, directorio, "poblacion_")
+            pool = obtener_pool_simulacion()
+            comparaciones = []
+            for inicio in range(0, len(candidatas), procesos):
+                lote = candidatas[inicio:inicio + procesos]
+                comparaciones.extend(pool.map(_comparar_en_proceso, [base_compartida] * len(lote), lote,
+                                              [poblacion_compartida] * len(lote)))
+    else:
+        comparaciones = [_comparar(base, reglas, poblacion) for reglas in candidatas]
+    
+    return {
+        "leads": int(len(base["score_total"])),
+        "actual": _resumen_scores(base["score_total"], base["clasificacion"]),
+        "candidatas": comparaciones,
+    }
+
+def simular_cli(argumentos: List[str]):
+    """python main.py simular --reglas candidatas.json [--leads leads.jsonl | --almacen DIR]"""
+    parser = argparse.ArgumentParser(prog="main.py simular",
+                                     description="Simula reglas de scoring candidatas sobre la base de leads")
+    parser.add_argument("--reglas", required=True,
+                        help="JSON con una regla o una lista de reglas (campos de ReglasScoring)")
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--leads", help="Archivo JSONL con un LeadData por línea")
+    origen.add_argument("--almacen", help="Directorio del almacén de leads (por defecto SHERLOCK_ALMACEN_LEADS); "
+                                          "se abre en sólo lectura y puede estar en uso por el servicio")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos en paralelo (por defecto y como máximo, el número de CPUs)")
+    args = parser.parse_args(argumentos)
+    
+    with open(args.reglas, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    candidatas = [ReglasScoring(**r) for r in (datos if isinstance(datos, list) else [datos])]
+    
+    if args.leads:
+        with open(args.leads, "r", encoding="utf-8") as f:
+            poblacion = poblacion_desde_leads([json.loads(linea) for linea in f if linea.strip()])
+    else:
+        try:
+            almacen = AlmacenLeads(args.almacen or RUTA_ALMACEN_LEADS, solo_lectura=True)
+        except ValueError as e:
+            parser.error(str(e))
+        poblacion = almacen.poblacion()
+    
+    try:
+        print(json.dumps(simular_reglas(poblacion, candidatas, args.procesos), ensure_ascii=False, indent=2))
+    finally:
+        cerrar_pool_simulacion()
+
 # Endpoints API
 @app.get("/")
 def root():
@@ -241,32 +1427,76 @@ def analyze_lead(lead: LeadData):
     """Analiza un lead y retorna scoring, diagnóstico y recomendaciones"""
     
     try:
-        # Generar ID único para el lead
-        lead_id = f"LEAD_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Generar ID único para el lead (el sufijo evita colisiones dentro del mismo segundo)
+        lead_id = f"LEAD_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         
         # Procesar análisis
         scoring = calcular_scoring(lead)
         diagnostico = generar_diagnostico(lead, scoring)
         recomendaciones = generar_recomendaciones(lead, scoring, diagnostico)
+        ahora = datetime.now()
+        
+        # Detectar si la empresa ya fue analizada
+        indice = obtener_indice_empresas()
+        duplicado = indice.buscar(lead.empresa)
+        
+        try:
+            obtener_almacen_leads().agregar(lead, scoring, diagnostico, ahora)
+        except Exception:
+            logger.exception("Error guardando lead %s en el almacén", lead_id)
         
-        response = SherlockResponse(
+        # Los campos ya tienen la forma de SherlockResponse: se serializan directamente
+        contenido = serializar_respuesta(
             lead_id=lead_id,
-            timestamp=datetime.now().isoformat(),
+            timestamp=ahora.isoformat(),
             scoring=scoring,
             diagnostico=diagnostico,
-            recomendaciones=recomendaciones
+            recomendaciones=recomendaciones,
+            duplicado=duplicado
         )
         
-        return response
+        # Sólo se registra la empresa cuando el análisis se completó y el lead_id se devuelve
+        if duplicado is None:
+            indice.buscar_o_agregar(lead_id, lead.empresa)
+        
+        return Response(content=contenido, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error procesando lead: {str(e)}")
 
+@app.get("/stats")
+def stats(agrupar_por: Optional[str] = None, desde: Optional[str] = None,
+          hasta: Optional[str] = None, clasificacion: Optional[str] = None,
+          industria: Optional[str] = None):
+    """Agregados de los leads analizados
+
+    agrupar_por acepta dimensiones separadas por comas (clasificacion, industria,
+    dia, semana); desde/hasta son fechas ISO 8601 (hasta exclusivo).
+    """
+    try:
+        return obtener_almacen_leads().estadisticas(
+            agrupar_por=[d.strip() for d in agrupar_por.split(",") if d.strip()] if agrupar_por else [],
+            desde=datetime.fromisoformat(desde) if desde else None,
+            hasta=datetime.fromisoformat(hasta) if hasta else None,
+            clasificacion=clasificacion,
+            industria=industria
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.post("/simulate")
+def simulate(request: SimulacionRequest):
+    """Simula reglas de scoring candidatas sobre todos los leads analizados"""
+    try:
+        return simular_reglas(obtener_almacen_leads().poblacion(), request.reglas, request.procesos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Endpoint para testing rápido
 @app.get("/test")
 def test_endpoint():
@@ -286,8 +1516,24 @@ def test_endpoint():
         decision_maker=True
     )
     
-    return analyze_lead(sample_lead)
+    # Sólo la lógica de análisis: los datos de ejemplo no deben registrarse en el
+    # índice de empresas ni en el almacén de leads
+    scoring = calcular_scoring(sample_lead)
+    diagnostico = generar_diagnostico(sample_lead, scoring)
+    recomendaciones = generar_recomendaciones(sample_lead, scoring, diagnostico)
+    contenido = serializar_respuesta(
+        lead_id="LEAD_TEST",
+        timestamp=datetime.now().isoformat(),
+        scoring=scoring,
+        diagnostico=diagnostico,
+        recomendaciones=recomendaciones
+    )
+    
+    return Response(content=contenido, media_type="application/json")
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if sys.argv[1:2] == ["simular"]:
+        simular_cli(sys.argv[2:])
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
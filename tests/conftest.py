@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# main.py vive en la raíz del repositorio
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Los tests no deben tocar el almacén ni el índice persistidos del entorno
+os.environ["SHERLOCK_ALMACEN_LEADS"] = tempfile.mkdtemp(prefix="sherlock_tests_")
+os.environ.pop("SHERLOCK_INDICE_EMPRESAS", None)
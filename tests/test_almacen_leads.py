@@ -0,0 +1,192 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from main import AlmacenLeads, LeadData, calcular_scoring, generar_diagnostico
+
+
+def crear_lead(**cambios):
+    datos = dict(
+        nombre="Ana", empresa="Acme", facturacion_anual=800000, empleados=45, industria="Tecnología",
+        pain_points=[], presupuesto_marketing=40000, canales_actuales=[], objetivos_principales=[],
+        urgencia=8, decision_maker=True
+    )
+    datos.update(cambios)
+    return LeadData(**datos)
+
+
+def agregar(almacen, lead, momento=datetime(2026, 10, 19, 12, 0)):
+    scoring = calcular_scoring(lead)
+    almacen.agregar(lead, scoring, generar_diagnostico(lead, scoring), momento)
+    return scoring
+
+
+def filas_por_columna(almacen):
+    return {columna: os.path.getsize(almacen._ruta(columna)) / struct.calcsize(formato)
+            for columna, formato in almacen._formatos.items()}
+
+
+def test_estadisticas_por_industria_y_clasificacion(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    hot = agregar(almacen, crear_lead(facturacion_anual=2000000, empleados=200, presupuesto_marketing=300000))
+    cold = agregar(almacen, crear_lead(industria="salud ", facturacion_anual=50000, empleados=5,
+                                       presupuesto_marketing=500, urgencia=9))
+    resultado = almacen.estadisticas(agrupar_por=["industria", "clasificacion"])
+    assert resultado["total"] == 2
+    assert [(g["industria"], g["clasificacion"], g["conteo"]) for g in resultado["grupos"]] == [
+        ("tecnología", hot["clasificacion"], 1), ("salud", cold["clasificacion"], 1)]
+    assert resultado["grupos"][0]["score_total_promedio"] == hot["score_total"]
+
+
+def test_valor_fuera_de_rango_no_desalinea_columnas(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    with pytest.raises(struct.error):
+        agregar(almacen, crear_lead(empleados=2 ** 63))
+    agregar(almacen, crear_lead(facturacion_anual=50000, empleados=5, presupuesto_marketing=500))
+    
+    assert almacen.filas == 2
+    assert set(filas_por_columna(almacen).values()) == {2}
+    poblacion = almacen.poblacion()
+    assert poblacion["facturacion_anual"].tolist() == [800000, 50000]
+
+
+def test_error_de_escritura_descarta_la_fila_incompleta(tmp_path, monkeypatch):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    
+    abrir = open
+    def abrir_fallando(ruta, *args, **kwargs):
+        if ruta.endswith("empleados.bin"):
+            raise OSError("disco lleno")
+        return abrir(ruta, *args, **kwargs)
+    almacen.cerrar()
+    monkeypatch.setattr("builtins.open", abrir_fallando)
+    with pytest.raises(OSError):
+        agregar(almacen, crear_lead())
+    monkeypatch.setattr("builtins.open", abrir)
+    
+    assert almacen.filas == 1
+    assert set(filas_por_columna(almacen).values()) == {1}
+    assert AlmacenLeads(str(tmp_path)).filas == 1
+
+
+def leer_manifiesto(directorio):
+    with open(os.path.join(directorio, "diccionarios.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def escribir_manifiesto(directorio, manifiesto):
+    with open(os.path.join(directorio, "diccionarios.json"), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+
+
+def test_columna_registrada_ausente_no_borra_el_almacen(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    almacen.cerrar()
+    tamano_timestamp = os.path.getsize(almacen._ruta("timestamp"))
+    os.remove(almacen._ruta("urgencia"))
+    
+    with pytest.raises(ValueError, match="urgencia"):
+        AlmacenLeads(str(tmp_path))
+    assert os.path.getsize(almacen._ruta("timestamp")) == tamano_timestamp
+
+
+def test_columna_sin_registrar_es_un_error_y_no_se_rellena(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    agregar(almacen, crear_lead())
+    almacen.cerrar()
+    # Almacén creado antes de que existiera la columna: unos ceros se tomarían por urgencia=0
+    manifiesto = leer_manifiesto(str(tmp_path))
+    del manifiesto["columnas"]["urgencia"]
+    escribir_manifiesto(str(tmp_path), manifiesto)
+    os.remove(almacen._ruta("urgencia"))
+    
+    for solo_lectura in (False, True):
+        with pytest.raises(ValueError, match="urgencia"):
+            AlmacenLeads(str(tmp_path), solo_lectura=solo_lectura)
+    assert not os.path.exists(almacen._ruta("urgencia"))
+    assert leer_manifiesto(str(tmp_path)) == manifiesto
+
+
+def test_manifiesto_sin_version_no_se_admite(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    almacen.cerrar()
+    escribir_manifiesto(str(tmp_path), leer_manifiesto(str(tmp_path))["diccionarios"])
+    
+    with pytest.raises(ValueError, match="Versión"):
+        AlmacenLeads(str(tmp_path))
+
+
+def test_almacen_nuevo_vacio_se_puede_reabrir(tmp_path):
+    AlmacenLeads(str(tmp_path))
+    assert AlmacenLeads(str(tmp_path)).filas == 0
+    assert AlmacenLeads(str(tmp_path), solo_lectura=True).poblacion()["urgencia"].tolist() == []
+
+
+def test_solo_se_descarta_una_fila_a_medias(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    agregar(almacen, crear_lead())
+    almacen.cerrar()
+    # Escritura interrumpida: algunas columnas con la fila completa, otra a medias
+    with open(almacen._ruta("timestamp"), "ab") as f:
+        f.write(struct.pack("<q", 123))
+    with open(almacen._ruta("potencial_ingresos"), "ab") as f:
+        f.write(b"\1\2\3")
+    
+    reabierto = AlmacenLeads(str(tmp_path))
+    assert reabierto.filas == 2
+    assert set(filas_por_columna(reabierto).values()) == {2}
+
+
+def test_diferencia_de_mas_de_una_fila_es_un_error(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead())
+    almacen.cerrar()
+    with open(almacen._ruta("timestamp"), "ab") as f:
+        f.write(struct.pack("<qq", 1, 2))
+    
+    with pytest.raises(ValueError, match="inconsistente"):
+        AlmacenLeads(str(tmp_path))
+    assert os.path.getsize(almacen._ruta("timestamp")) == 3 * 8
+
+
+def test_solo_lectura_no_modifica_el_almacen_en_uso(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path))
+    agregar(almacen, crear_lead(facturacion_anual=100000))
+    agregar(almacen, crear_lead(facturacion_anual=200000))
+    # El servicio está escribiendo la tercera fila: sólo algunas columnas la tienen
+    with open(almacen._ruta("timestamp"), "ab") as f:
+        f.write(struct.pack("<q", 123))
+    with open(almacen._ruta("facturacion_anual"), "ab") as f:
+        f.write(b"\1\2\3")
+    antes = {nombre: (tmp_path / nombre).read_bytes() for nombre in os.listdir(tmp_path)}
+    
+    lectura = AlmacenLeads(str(tmp_path), solo_lectura=True)
+    assert lectura.filas == 2
+    assert lectura.poblacion()["facturacion_anual"].tolist() == [100000, 200000]
+    with pytest.raises(ValueError, match="sólo lectura"):
+        agregar(lectura, crear_lead())
+    assert {nombre: (tmp_path / nombre).read_bytes() for nombre in os.listdir(tmp_path)} == antes
+
+
+def test_solo_lectura_no_crea_el_almacen(tmp_path):
+    with pytest.raises(ValueError, match="No hay un almacén"):
+        AlmacenLeads(str(tmp_path / "no_existe"), solo_lectura=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_importar_main_no_crea_el_almacen(tmp_path):
+    entorno = {k: v for k, v in os.environ.items() if k != "SHERLOCK_ALMACEN_LEADS"}
+    entorno["PYTHONPATH"] = os.path.join(os.path.dirname(__file__), "..")
+    subprocess.run([sys.executable, "-c", "import main"], cwd=tmp_path, env=entorno, check=True)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+import main
+from main import AlmacenLeads, IndiceEmpresas
+
+
+def test_endpoint_de_prueba_no_tiene_efectos_secundarios(tmp_path, monkeypatch):
+    indice = IndiceEmpresas()
+    almacen = AlmacenLeads(str(tmp_path))
+    monkeypatch.setattr(main, "_indice_empresas", indice)
+    monkeypatch.setattr(main, "_almacen_leads", almacen)
+    cliente = TestClient(main.app)
+    
+    for _ in range(3):
+        respuesta = cliente.get("/test").json()
+        assert respuesta["scoring"]["clasificacion"] == "WARM"
+        assert respuesta["duplicado"] is None
+    assert len(indice) == 0
+    assert almacen.filas == 0
+
+
+def test_fallo_del_almacen_se_registra_y_no_rompe_analyze(monkeypatch, caplog):
+    class AlmacenRoto:
+        def agregar(self, *args):
+            raise OSError("disco lleno")
+    monkeypatch.setattr(main, "_indice_empresas", IndiceEmpresas())
+    monkeypatch.setattr(main, "_almacen_leads", AlmacenRoto())
+    lead = dict(nombre="Ana", empresa="Acme", facturacion_anual=800000, empleados=45, industria="salud",
+                pain_points=[], presupuesto_marketing=40000, canales_actuales=[], objetivos_principales=[],
+                urgencia=8, decision_maker=True)
+    
+    with caplog.at_level("ERROR", logger="main"):
+        respuesta = TestClient(main.app).post("/analyze", json=lead)
+    assert respuesta.status_code == 200
+    assert "Error guardando lead" in caplog.text and "disco lleno" in caplog.text
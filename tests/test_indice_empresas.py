@@ -0,0 +1,278 @@
+import os
+import random
+import string
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import IndiceEmpresas, normalizar_empresa
+
+
+def lead_payload(empresa, **cambios):
+    datos = dict(
+        nombre="Ana", empresa=empresa, facturacion_anual=800000, empleados=45,
+        industria="tecnología", pain_points=["generación de leads"], presupuesto_marketing=40000,
+        canales_actuales=["LinkedIn"], objetivos_principales=["aumentar leads"],
+        urgencia=8, decision_maker=True
+    )
+    datos.update(cambios)
+    return datos
+
+
+def nombre_aleatorio(rnd):
+    return " ".join(
+        "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9)))
+        for _ in range(rnd.randint(1, 3))
+    )
+
+
+@pytest.mark.parametrize("consulta", [
+    "Techcorp Solutions S.A.",
+    "TECHCORP",
+    "TechCorp Inc.",
+    "techcorp, s.a. de c.v.",
+    "TechCorp Group LLC",
+])
+def test_variantes_de_sufijo_y_mayusculas(consulta):
+    indice = IndiceEmpresas()
+    indice.agregar("L1", "TechCorp Solutions")
+    assert indice.buscar(consulta) == {"lead_id": "L1", "empresa": "TechCorp Solutions", "similitud": 1.0}
+
+
+@pytest.mark.parametrize("original, consulta", [
+    ("Société Générale", "Societe Generale S.A."),
+    ("Construcciones López", "CONSTRUCCIONES LOPEZ"),
+    ("Газпром", "ГАЗПРОМ"),
+])
+def test_variantes_de_acentos_y_alfabetos(original, consulta):
+    indice = IndiceEmpresas()
+    indice.agregar("L1", original)
+    assert indice.buscar(consulta)["lead_id"] == "L1"
+
+
+def test_nombres_distintos_no_coinciden():
+    nombres = ["TechCorp Solutions", "Acme Industrias", "Banco Andino", "株式会社トヨタ",
+               "サムスン電子", "Газпром", "Ελληνικά Πετρέλαια", "Data Soft"]
+    indice = IndiceEmpresas()
+    for i, nombre in enumerate(nombres):
+        assert indice.buscar_o_agregar(f"L{i}", nombre) is None
+    assert len(indice) == len(nombres)
+
+
+@pytest.mark.parametrize("nombre", ["", "!!!", "...", "  -  "])
+def test_nombre_vacio_no_se_indexa_ni_coincide(nombre):
+    assert normalizar_empresa(nombre) == ""
+    indice = IndiceEmpresas()
+    assert indice.buscar_o_agregar("L1", nombre) is None
+    assert len(indice) == 0
+    assert indice.buscar("???") is None
+
+
+def test_recall_y_precision_sinteticos():
+    rnd = random.Random(7)
+    nombres = [nombre_aleatorio(rnd) for _ in range(5000)]
+    indice = IndiceEmpresas()
+    for i, nombre in enumerate(nombres):
+        indice.agregar(f"L{i}", nombre)
+    
+    variantes = [(i, rnd.choice([nombre.upper() + " S.A.", nombre.title() + " Solutions", nombre + " inc"]))
+                 for i, nombre in enumerate(nombres[:1000])]
+    aciertos = sum(1 for i, variante in variantes
+                   if (duplicado := indice.buscar(variante)) and duplicado["lead_id"] == f"L{i}")
+    assert aciertos / len(variantes) >= 0.99
+    
+    conocidos = set(nombres)
+    distintos = [n for n in (nombre_aleatorio(rnd) for _ in range(1000)) if n not in conocidos]
+    falsos_positivos = sum(1 for nombre in distintos if indice.buscar(nombre))
+    assert falsos_positivos / len(distintos) <= 0.01
+
+
+class IndicePequeno(IndiceEmpresas):
+    LIMITE_PENDIENTES = 8
+
+
+def test_busca_en_claves_consolidadas_y_pendientes():
+    indice = IndicePequeno()
+    for i in range(20):
+        indice.agregar(f"L{i}", f"Empresa {chr(ord('a') + i) * 5}")
+    assert indice._consolidadas == 16 and indice._num_pendientes == 4
+    assert indice.buscar("EMPRESA AAAAA S.A.")["lead_id"] == "L0"
+    assert indice.buscar("Empresa ttttt")["lead_id"] == "L19"
+
+
+def esperar_compactacion(indice):
+    # Espera a la fusión en segundo plano, si la hay, y completa las pendientes
+    with indice._lock_fusion:
+        pass
+    indice._compactar()
+
+
+def test_ante_empate_gana_el_lead_mas_antiguo():
+    indice = IndicePequeno()
+    for i in range(12):
+        indice.agregar(f"L{i}", "TechCorp")
+    assert indice.buscar("TECHCORP")["lead_id"] == "L0"
+    # Con más empates que max_por_cubeta repartidos en varias corridas
+    for i in range(12, 200):
+        indice.agregar(f"L{i}", "TechCorp")
+    assert indice.buscar("TECHCORP")["lead_id"] == "L0"
+    esperar_compactacion(indice)
+    assert indice.buscar("TECHCORP")["lead_id"] == "L0"
+
+
+def test_corridas_escalonadas_y_ordenadas():
+    rnd = random.Random(11)
+    nombres = list({nombre_aleatorio(rnd) for _ in range(1000)})
+    indice = IndicePequeno()
+    for i, nombre in enumerate(nombres):
+        indice.agregar(f"L{i}", nombre)
+    esperar_compactacion(indice)
+    
+    tamanos = [len(claves) for claves, _ in indice._corridas]
+    assert all(a >= 2 * b for a, b in zip(tamanos, tamanos[1:]))
+    assert len(tamanos) <= np.log2(len(nombres) / IndicePequeno.LIMITE_PENDIENTES) + 1
+    for claves, _ in indice._corridas:
+        assert np.all(np.diff(claves) >= 0)
+    posiciones = np.sort(np.concatenate([p for _, p in indice._corridas]))
+    assert np.array_equal(posiciones, np.repeat(np.arange(indice._consolidadas), indice.bandas))
+    for i in rnd.sample(range(len(nombres)), 200):
+        assert indice.buscar(nombres[i].upper() + " S.A.")["lead_id"] == f"L{i}"
+
+
+def test_las_consultas_no_esperan_a_las_fusiones(monkeypatch):
+    indice = IndicePequeno()
+    with monkeypatch.context() as m:
+        m.setattr(indice, "_programar_compactacion", lambda: None)
+        for i in range(16):
+            indice.agregar(f"L{i}", f"Empresa {chr(ord('a') + i) * 5}")
+    assert len(indice._corridas) == 2
+    
+    fusionar = IndiceEmpresas._fusionar_corridas
+    resultados = []
+    def fusionar_consultando(antigua, reciente):
+        consulta = threading.Thread(target=lambda: resultados.append(indice.buscar("Empresa aaaaa")))
+        consulta.start()
+        consulta.join(timeout=5)
+        assert not consulta.is_alive()
+        return fusionar(antigua, reciente)
+    monkeypatch.setattr(indice, "_fusionar_corridas", fusionar_consultando)
+    indice._compactar()
+    assert resultados[0]["lead_id"] == "L0"
+    assert len(indice._corridas) == 1
+
+
+def test_guardar_y_cargar(tmp_path):
+    indice = IndicePequeno()
+    for i in range(20):
+        indice.agregar(f"L{i}", f"Compañía {i:03d} Ñandú")
+    ruta = str(tmp_path / "indice.npz")
+    indice.guardar(ruta)
+    
+    cargado = IndiceEmpresas.cargar(ruta)
+    assert len(cargado) == 20
+    for i in range(20):
+        assert cargado.buscar(f"COMPAÑIA {i:03d} ñandu S.A.") == indice.buscar(f"COMPAÑIA {i:03d} ñandu S.A.")
+
+
+def test_las_empresas_sobreviven_a_un_kill_9(tmp_path):
+    ruta = str(tmp_path / "indice.npz")
+    codigo = (
+        "import os, signal, main\n"
+        f"indice = main.IndiceEmpresas.abrir({ruta!r})\n"
+        "indice.agregar('L1', 'TechCorp Solutions')\n"
+        "indice.agregar('L2', 'Ñandú Consultores')\n"
+        "os.kill(os.getpid(), signal.SIGKILL)\n"
+    )
+    entorno = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), ".."))
+    proceso = subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, env=entorno)
+    assert proceso.returncode == -9
+    assert not os.path.exists(ruta)
+    
+    indice = IndiceEmpresas.abrir(ruta)
+    assert indice.buscar("TECHCORP S.A.")["lead_id"] == "L1"
+    assert indice.buscar("nandu consultores")["lead_id"] == "L2"
+    # Al abrir se consolida en una instantánea y el registro queda vacío
+    assert os.path.exists(ruta) and os.path.getsize(ruta + ".log") == 0
+    indice.cerrar()
+
+
+def test_linea_a_medias_del_registro_se_ignora(tmp_path):
+    ruta = str(tmp_path / "indice.npz")
+    indice = IndiceEmpresas.abrir(ruta)
+    indice.agregar("L1", "TechCorp")
+    with open(ruta + ".log", "ab") as f:
+        f.write(b'[1, "L2", "Acm')
+    
+    reabierto = IndiceEmpresas.abrir(ruta)
+    assert len(reabierto) == 1
+    reabierto.agregar("L3", "Globex")
+    otra_vez = IndiceEmpresas.abrir(ruta)
+    assert otra_vez.buscar("GLOBEX")["lead_id"] == "L3"
+    assert otra_vez.buscar("TechCorp")["lead_id"] == "L1"
+
+
+class IndiceRegistroCorto(IndicePequeno):
+    LIMITE_REGISTRO = 10
+
+
+def test_instantanea_periodica_recorta_el_registro(tmp_path):
+    ruta = str(tmp_path / "indice.npz")
+    rnd = random.Random(5)
+    nombres = list({nombre_aleatorio(rnd) for _ in range(25)})
+    indice = IndiceRegistroCorto.abrir(ruta)
+    for i, nombre in enumerate(nombres):
+        indice.agregar(f"L{i}", nombre)
+        # Espera a la instantánea en segundo plano, si se programó
+        while indice._guardado_programado:
+            with indice._lock_guardado:
+                pass
+    
+    assert len(IndiceEmpresas.cargar(ruta)) >= 20
+    with open(ruta + ".log", encoding="utf-8") as f:
+        assert len(f.readlines()) < IndiceRegistroCorto.LIMITE_REGISTRO
+    reabierto = IndiceEmpresas.abrir(ruta)
+    assert len(reabierto) == len(nombres)
+    for i, nombre in enumerate(nombres):
+        assert reabierto.buscar(nombre)["lead_id"] == f"L{i}"
+
+
+def test_importar_main_no_carga_el_indice(tmp_path):
+    ruta = str(tmp_path / "indice.npz")
+    indice = IndiceEmpresas()
+    indice.agregar("L1", "TechCorp")
+    indice.guardar(ruta)
+    entorno = dict(os.environ, SHERLOCK_INDICE_EMPRESAS=ruta,
+                   PYTHONPATH=os.path.join(os.path.dirname(__file__), ".."))
+    codigo = "import main; assert main._indice_empresas is None; print(len(main.obtener_indice_empresas()))"
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=tmp_path, env=entorno, check=True,
+                            capture_output=True, text=True).stdout
+    assert salida.strip() == "1"
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(main, "_indice_empresas", IndiceEmpresas())
+    return TestClient(main.app)
+
+
+def test_analyze_enlaza_con_el_lead_original(cliente):
+    primero = cliente.post("/analyze", json=lead_payload("TechCorp Solutions")).json()
+    segundo = cliente.post("/analyze", json=lead_payload("TECHCORP S.A.")).json()
+    assert primero["duplicado"] is None
+    assert segundo["duplicado"]["lead_id"] == primero["lead_id"]
+    assert segundo["lead_id"] != primero["lead_id"]
+
+
+def test_analyze_fallido_no_registra_la_empresa(cliente, monkeypatch):
+    def fallar(*args):
+        raise RuntimeError("fallo")
+    with monkeypatch.context() as m:
+        m.setattr(main, "generar_recomendaciones", fallar)
+        assert cliente.post("/analyze", json=lead_payload("TechCorp Solutions")).status_code == 500
+    assert cliente.post("/analyze", json=lead_payload("TechCorp Solutions")).json()["duplicado"] is None
@@ -0,0 +1,122 @@
+import json
+import os
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import (CLASIFICACIONES, AlmacenLeads, LeadData, ReglasScoring, calcular_scoring,
+                  calcular_scoring_vectorizado, generar_diagnostico, poblacion_desde_leads, simular_cli,
+                  simular_reglas)
+
+
+def leads_aleatorios(n, semilla=3):
+    rnd = random.Random(semilla)
+    return [dict(
+        nombre="Ana", empresa=f"E{i}", industria="salud", pain_points=[], canales_actuales=[],
+        objetivos_principales=[],
+        facturacion_anual=rnd.choice([0, 99999.9, 100000, 500000, 1000000, rnd.uniform(0, 3e6)]),
+        empleados=rnd.choice([0, 9, 10, 49, 50, 100, 500]),
+        presupuesto_marketing=rnd.choice([0, 2000, 20000, 50000, 100000, rnd.uniform(0, 3e5)]),
+        urgencia=rnd.randint(0, 11), decision_maker=rnd.random() < 0.5,
+    ) for i in range(n)]
+
+
+@pytest.fixture(scope="module")
+def poblacion():
+    return poblacion_desde_leads(leads_aleatorios(3000))
+
+
+def test_reglas_actuales_equivalen_a_calcular_scoring():
+    leads = leads_aleatorios(3000)
+    vectorizado = calcular_scoring_vectorizado(poblacion_desde_leads(leads), ReglasScoring())
+    for i, lead in enumerate(leads):
+        scoring = calcular_scoring(LeadData(**lead))
+        assert CLASIFICACIONES[vectorizado["clasificacion"][i]] == scoring["clasificacion"]
+        assert round(float(vectorizado["score_total"][i]), 1) == scoring["score_total"]
+
+
+def test_reglas_identicas_no_cambian_nada(poblacion):
+    resultado = simular_reglas(poblacion, [ReglasScoring(nombre="igual")], procesos=1)
+    comparacion = resultado["candidatas"][0]
+    assert comparacion["suben"] == comparacion["bajan"] == 0
+    assert comparacion["sin_cambio"] == resultado["leads"] == 3000
+    assert set(comparacion["delta_clasificacion"].values()) == {0}
+
+
+def test_bajar_el_umbral_hot_solo_promueve_warm(poblacion):
+    comparacion = simular_reglas(poblacion, [ReglasScoring(umbral_hot=70)], procesos=1)["candidatas"][0]
+    transiciones = comparacion["transiciones"]
+    assert comparacion["bajan"] == 0
+    assert comparacion["suben"] == transiciones["WARM"]["HOT"] > 0
+    assert comparacion["delta_clasificacion"]["HOT"] == -comparacion["delta_clasificacion"]["WARM"]
+
+
+def test_en_paralelo_da_lo_mismo_que_en_serie(poblacion, monkeypatch):
+    candidatas = [ReglasScoring(nombre=f"hot{u}", umbral_hot=u) for u in (70, 75, 85)]
+    en_serie = simular_reglas(poblacion, candidatas, procesos=1)
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 2)
+    try:
+        en_paralelo = simular_reglas(poblacion, candidatas, procesos=2)
+    finally:
+        main.cerrar_pool_simulacion()
+    assert en_paralelo == en_serie
+
+
+def test_columnas_del_almacen_se_comparten_sin_copiarlas(tmp_path):
+    almacen = AlmacenLeads(str(tmp_path / "almacen"))
+    for lead in leads_aleatorios(6):
+        lead = LeadData(**lead)
+        scoring = calcular_scoring(lead)
+        almacen.agregar(lead, scoring, generar_diagnostico(lead, scoring), datetime(2026, 10, 19))
+    poblacion = almacen.poblacion()
+    # Una vista que no empieza en la primera fila y un array en memoria
+    columnas = dict(poblacion, urgencia=poblacion["urgencia"][2:], otra=np.arange(4.0))
+    
+    compartidas = main._compartir_columnas(columnas, str(tmp_path), "p_")
+    assert compartidas["facturacion_anual"][0] == almacen._ruta("facturacion_anual")
+    assert compartidas["urgencia"][0] == almacen._ruta("urgencia")
+    assert sorted(os.listdir(tmp_path)) == ["almacen", "p_otra.bin"]
+    mapeadas = main._mapear_columnas(compartidas)
+    for campo, valores in columnas.items():
+        assert mapeadas[campo].tolist() == valores.tolist()
+
+
+def test_procesos_se_limita_al_numero_de_cpus(poblacion, monkeypatch):
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(main, "obtener_pool_simulacion", lambda: pytest.fail("no debe crear procesos"))
+    resultado = simular_reglas(poblacion, [ReglasScoring(), ReglasScoring(umbral_hot=70)], procesos=1000)
+    assert len(resultado["candidatas"]) == 2
+
+
+@pytest.mark.parametrize("cuerpo", [
+    {"reglas": [{}] * (main.MAX_REGLAS_SIMULACION + 1)},
+    {"reglas": [{}], "procesos": 0},
+    {"reglas": [{"puntos_facturacion": [1, 2]}]},
+    {"reglas": [{"umbral_hot": 50, "umbral_warm": 60}]},
+])
+def test_simulate_rechaza_peticiones_invalidas(cuerpo, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "_almacen_leads", main.AlmacenLeads(str(tmp_path)))
+    assert TestClient(main.app).post("/simulate", json=cuerpo).status_code == 400
+
+
+def test_cli_lee_el_almacen_sin_modificarlo(tmp_path, capsys):
+    directorio = tmp_path / "almacen"
+    almacen = AlmacenLeads(str(directorio))
+    for lead in leads_aleatorios(5):
+        lead = LeadData(**lead)
+        scoring = calcular_scoring(lead)
+        almacen.agregar(lead, scoring, generar_diagnostico(lead, scoring), datetime(2026, 10, 19))
+    # Fila a medias de una escritura en curso del servicio
+    with open(almacen._ruta("timestamp"), "ab") as f:
+        f.write(b"\1\2")
+    antes = {nombre: (directorio / nombre).read_bytes() for nombre in os.listdir(directorio)}
+    reglas = tmp_path / "reglas.json"
+    reglas.write_text(json.dumps({"nombre": "hot70", "umbral_hot": 70}))
+    
+    simular_cli(["--reglas", str(reglas), "--almacen", str(directorio)])
+    assert json.loads(capsys.readouterr().out)["leads"] == 5
+    assert {nombre: (directorio / nombre).read_bytes() for nombre in os.listdir(directorio)} == antes
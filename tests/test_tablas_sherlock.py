@@ -0,0 +1,242 @@
+"""Equivalencia de las tablas precalculadas con la lógica if/elif original"""
+import json
+from itertools import permutations, product
+
+import pytest
+
+from main import (CLASIFICACIONES, TABLA_DIAGNOSTICO, TABLA_PAIN_POINTS, TABLA_RECOMENDACIONES,
+                  LeadData, calcular_scoring, generar_diagnostico, generar_recomendaciones)
+
+
+# Implementación original, previa a las tablas precalculadas
+def diagnostico_original(lead, scoring):
+    fortalezas = []
+    if scoring["score_financiero"] >= 20:
+        fortalezas.append("Empresa con sólida capacidad financiera")
+    if scoring["score_tamano"] >= 15:
+        fortalezas.append("Organización de tamaño considerable")
+    if scoring["score_presupuesto"] >= 20:
+        fortalezas.append("Presupuesto de marketing bien dimensionado")
+    if scoring["score_urgencia"] >= 10:
+        fortalezas.append("Alta urgencia en la necesidad")
+    if lead.decision_maker:
+        fortalezas.append("Contacto directo con tomador de decisiones")
+    
+    debilidades = []
+    if scoring["score_financiero"] < 15:
+        debilidades.append("Capacidad financiera limitada")
+    if scoring["score_presupuesto"] < 15:
+        debilidades.append("Presupuesto de marketing insuficiente")
+    if scoring["score_urgencia"] < 8:
+        debilidades.append("Baja urgencia en la implementación")
+    if not lead.decision_maker:
+        debilidades.append("No es el decisor final")
+    
+    industrias_digitales = ["tecnología", "software", "ecommerce", "fintech", "saas"]
+    industrias_tradicionales = ["manufactura", "construcción", "agricultura", "retail físico"]
+    if any(ind in lead.industria.lower() for ind in industrias_digitales):
+        perfil_digital = "ALTO - Industria naturalmente digital"
+    elif any(ind in lead.industria.lower() for ind in industrias_tradicionales):
+        perfil_digital = "MEDIO - Industria en proceso de digitalización"
+    else:
+        perfil_digital = "VARIABLE - Requiere análisis específico"
+    
+    pain_analysis = {}
+    for pain in lead.pain_points:
+        if "lead" in pain.lower() or "cliente" in pain.lower():
+            pain_analysis["generación_leads"] = "Crítico"
+        elif "conversión" in pain.lower() or "venta" in pain.lower():
+            pain_analysis["conversión"] = "Crítico"
+        elif "automatización" in pain.lower() or "proceso" in pain.lower():
+            pain_analysis["automatización"] = "Importante"
+        elif "seguimiento" in pain.lower() or "nurturing" in pain.lower():
+            pain_analysis["nurturing"] = "Importante"
+    
+    return {
+        "resumen": f"Lead {scoring['clasificacion']} con {scoring['porcentaje']}% de fit",
+        "fortalezas": fortalezas,
+        "debilidades": debilidades,
+        "perfil_digital": perfil_digital,
+        "pain_points_criticos": pain_analysis,
+        "potencial_ingresos": lead.presupuesto_marketing * 0.3,
+        "tiempo_estimado_cierre": "2-4 semanas" if scoring["clasificacion"] == "HOT" else "1-3 meses"
+    }
+
+
+def recomendaciones_original(lead, scoring, diagnostico):
+    dali_tasks = []
+    if "generación_leads" in diagnostico["pain_points_criticos"]:
+        dali_tasks.append("Crear case study específico para su industria")
+        dali_tasks.append("Diseñar landing page personalizada")
+    if scoring["clasificacion"] in ["HOT", "WARM"]:
+        dali_tasks.append("Preparar propuesta visual personalizada")
+        dali_tasks.append("Crear demo interactivo del producto")
+    
+    zuckerberg_tasks = []
+    if scoring["score_presupuesto"] >= 20:
+        zuckerberg_tasks.append("Proponer estrategia de LinkedIn Ads B2B")
+        zuckerberg_tasks.append("Configurar campañas de retargeting")
+    if lead.urgencia >= 7:
+        zuckerberg_tasks.append("Implementar campaña de urgencia limitada")
+    zuckerberg_tasks.append(f"Presupuesto sugerido: ${int(lead.presupuesto_marketing * 0.4)}/mes")
+    
+    coach_tasks = []
+    if scoring["clasificacion"] == "HOT":
+        coach_tasks.append("Agendar demo en próximas 48h")
+        coach_tasks.append("Preparar propuesta comercial personalizada")
+    elif scoring["clasificacion"] == "WARM":
+        coach_tasks.append("Secuencia de nurturing de 5 emails")
+        coach_tasks.append("Llamada de descubrimiento en 1 semana")
+    else:
+        coach_tasks.append("Incluir en secuencia de educación mensual")
+        coach_tasks.append("Seguimiento trimestral de re-calificación")
+    
+    if scoring["clasificacion"] == "HOT":
+        proximos_pasos = [
+            "🔥 URGENTE: Coach agenda demo en 24-48h",
+            "🎨 Dali prepara propuesta visual personalizada",
+            "📱 Zuckerberg configura retargeting inmediato"
+        ]
+    elif scoring["clasificacion"] == "WARM":
+        proximos_pasos = [
+            "📞 Coach programa llamada de descubrimiento",
+            "🎯 Zuckerberg inicia campaña de nurturing",
+            "📄 Dali crea contenido educativo específico"
+        ]
+    else:
+        proximos_pasos = [
+            "📧 Coach incluye en secuencia automatizada",
+            "📊 Seguimiento mensual de comportamiento",
+            "🔄 Re-evaluación en 90 días"
+        ]
+    
+    return {
+        "dali": {
+            "prioridad": "ALTA" if scoring["clasificacion"] in ["HOT", "WARM"] else "MEDIA",
+            "tareas": dali_tasks,
+            "deadline": "48h" if scoring["clasificacion"] == "HOT" else "1 semana"
+        },
+        "zuckerberg": {
+            "prioridad": "ALTA" if scoring["score_presupuesto"] >= 20 else "MEDIA",
+            "tareas": zuckerberg_tasks,
+            "presupuesto_sugerido": int(lead.presupuesto_marketing * 0.4)
+        },
+        "coach": {
+            "prioridad": "CRÍTICA" if scoring["clasificacion"] == "HOT" else "ALTA",
+            "tareas": coach_tasks,
+            "seguimiento": "Inmediato" if scoring["clasificacion"] == "HOT" else "1-2 semanas"
+        },
+        "proximos_pasos": proximos_pasos,
+        "timeline_estimado": diagnostico["tiempo_estimado_cierre"]
+    }
+
+
+# Un pain point representativo por categoría, en el orden de REGLAS_PAIN_POINTS
+PAIN_POR_CATEGORIA = {
+    "generación_leads": "Pocos Leads cualificados",
+    "conversión": "baja conversión en ventas",
+    "automatización": "Procesos manuales",
+    "nurturing": "falta de seguimiento",
+}
+INDUSTRIAS = ("Tecnología", "retail físico", "salud")
+# Clasificación fuera de CLASIFICACIONES: debe tratarse como COLD/UNQUALIFIED
+CLASIFICACIONES_PRUEBA = CLASIFICACIONES + ("OTRA",)
+
+
+def crear_lead(**cambios):
+    datos = dict(
+        nombre="Ana", empresa="Acme", facturacion_anual=800000, empleados=45, industria="tecnología",
+        pain_points=[], presupuesto_marketing=12345.67, canales_actuales=[], objetivos_principales=[],
+        urgencia=5, decision_maker=True
+    )
+    datos.update(cambios)
+    return LeadData(**datos)
+
+
+def crear_scoring(score_financiero, score_tamano, score_presupuesto, urgencia, decision_maker, clasificacion):
+    score_urgencia = (urgencia / 10) * 15
+    score_autoridad = 10 if decision_maker else 3
+    score_total = score_financiero + score_tamano + score_presupuesto + score_urgencia + score_autoridad
+    return {
+        "score_total": round(score_total, 1),
+        "score_financiero": score_financiero,
+        "score_tamano": score_tamano,
+        "score_presupuesto": score_presupuesto,
+        "score_urgencia": round(score_urgencia, 1),
+        "score_autoridad": score_autoridad,
+        "clasificacion": clasificacion,
+        "prioridad": "",
+        "porcentaje": round(score_total, 1),
+    }
+
+
+def clave_diagnostico(scoring, decision_maker):
+    return (
+        scoring["score_financiero"] >= 20, scoring["score_financiero"] < 15,
+        scoring["score_tamano"] >= 15,
+        scoring["score_presupuesto"] >= 20, scoring["score_presupuesto"] < 15,
+        scoring["score_urgencia"] >= 10, scoring["score_urgencia"] < 8,
+        decision_maker,
+    )
+
+
+def como_json(valor):
+    # Compara también el orden de las claves, que es visible en la respuesta
+    return json.dumps(valor, ensure_ascii=False)
+
+
+def test_tabla_diagnostico_en_todo_el_espacio_de_estados():
+    claves_vistas = set()
+    for sf, st, sp, urgencia, dm, clasificacion in product(
+            (5, 15, 20, 30), (5, 10, 15, 20), (5, 15, 20, 25), range(0, 12), (False, True),
+            CLASIFICACIONES_PRUEBA):
+        lead = crear_lead(urgencia=urgencia, decision_maker=dm, pain_points=["leads", "ventas"])
+        scoring = crear_scoring(sf, st, sp, urgencia, dm, clasificacion)
+        assert como_json(generar_diagnostico(lead, scoring)) == como_json(diagnostico_original(lead, scoring))
+        claves_vistas.add(clave_diagnostico(scoring, dm))
+    
+    # Todas las claves alcanzables (un score no puede ser alto y bajo a la vez) quedan cubiertas
+    alcanzables = {clave for clave in TABLA_DIAGNOSTICO
+                   if not (clave[0] and clave[1]) and not (clave[3] and clave[4]) and not (clave[5] and clave[6])}
+    assert len(TABLA_DIAGNOSTICO) == 2 ** 8
+    assert claves_vistas == alcanzables
+
+
+@pytest.mark.parametrize("industria", INDUSTRIAS)
+def test_tabla_pain_points_en_todas_las_secuencias(industria):
+    scoring = crear_scoring(20, 10, 15, 6, True, "WARM")
+    for secuencia in TABLA_PAIN_POINTS:
+        pains = [PAIN_POR_CATEGORIA[c] for c in secuencia]
+        # Repeticiones y pain points sin categoría no cambian el resultado
+        for variante in (pains, pains + pains[:1] + ["precio alto"], ["precio alto"] + pains[::-1] + pains):
+            lead = crear_lead(industria=industria, pain_points=variante)
+            assert como_json(generar_diagnostico(lead, scoring)) == como_json(diagnostico_original(lead, scoring))
+    assert set(TABLA_PAIN_POINTS) == {s for n in range(5) for s in permutations(PAIN_POR_CATEGORIA, n)}
+
+
+def test_tabla_recomendaciones_en_todo_el_espacio_de_estados():
+    claves_vistas = set()
+    for clasificacion, generacion_leads, sp, urgencia, presupuesto in product(
+            CLASIFICACIONES_PRUEBA, (False, True), (5, 15, 20, 25), range(0, 12), (0, 999.99, 12345.67)):
+        lead = crear_lead(urgencia=urgencia, presupuesto_marketing=presupuesto,
+                          pain_points=["más clientes"] if generacion_leads else ["procesos"])
+        scoring = crear_scoring(20, 10, sp, urgencia, True, clasificacion)
+        diagnostico = diagnostico_original(lead, scoring)
+        assert (como_json(generar_recomendaciones(lead, scoring, diagnostico))
+                == como_json(recomendaciones_original(lead, scoring, diagnostico)))
+        claves_vistas.add((clasificacion if clasificacion in CLASIFICACIONES else "UNQUALIFIED",
+                           generacion_leads, sp >= 20, urgencia >= 7))
+    assert claves_vistas == set(TABLA_RECOMENDACIONES)
+
+
+def test_pipeline_completo_con_calcular_scoring():
+    for facturacion, empleados, presupuesto, urgencia, dm in product(
+            (0, 99999, 100000, 500000, 1000000), (9, 10, 50, 100), (0, 2000, 20000, 60000),
+            (1, 5, 6, 7, 10), (False, True)):
+        lead = crear_lead(facturacion_anual=facturacion, empleados=empleados, presupuesto_marketing=presupuesto,
+                          urgencia=urgencia, decision_maker=dm, pain_points=["leads", "seguimiento"])
+        scoring = calcular_scoring(lead)
+        diagnostico = diagnostico_original(lead, scoring)
+        assert como_json(generar_diagnostico(lead, scoring)) == como_json(diagnostico)
+        assert (como_json(generar_recomendaciones(lead, scoring, diagnostico))
+                == como_json(recomendaciones_original(lead, scoring, diagnostico)))